@@ -1,18 +1,71 @@
-from fastapi import FastAPI, HTTPException, Depends
-from sqlalchemy import or_
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response, WebSocket
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import date, datetime
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
+import anyio
+import asyncio
+import os
 from models import *
-from database import get_db, init_db
+from archive import ARCHIVE_INTERVAL_SECONDS, delete_task_links, run_periodically
+from database import ASYNC_MODE, ReadSessionLocal, SessionLocal, db_endpoint, engine, get_db, init_db, read_engine
+from events import event_bus
+from export import EXPORT_WRITERS, aexport_chunks, export_chunks, export_query, supports_parquet
+from instrumentation import InstrumentationMiddleware, TimedRoute, instrument_engine, route_metrics
+from pagination import encode_cursor, decode_cursor
+from reminders import REMINDERS_ENABLED, reminder_scheduler
+from search import search_tasks, supports_search
+from serialization import (
+    DELETION_FIELDS, MEMBER_FIELDS, SYNC_TASK_FIELDS, TAG_FIELDS, TASK_FIELDS, TEAM_FIELDS, USER_FIELDS,
+    ORJSONResponse, as_dict, columns, dumps, dumps_lines, load_tags, personal_task_dict, personal_task_dicts, team_task_dicts
+)
+from sync import assignee_removed, cursor_expired, task_deleted
+from tag_index import load_scope_tags, tag_index, task_tag_scope
+from team_stats import DONE_STATUSES, read_team_stats
+from response_cache import etag_matches, make_etag, response_cache
+from user_cache import user_cache
 from pydantic import BaseModel, EmailStr
 
 app = FastAPI()
+app.router.route_class = TimedRoute
+app.add_middleware(InstrumentationMiddleware)
+instrument_engine(engine)
+instrument_engine(read_engine)
 
-# Initialize the database on startup
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Rows fetched (and relationships eager-loaded) per round trip when streaming
+STREAM_BATCH_SIZE = 500
+# Most tasks one bulk update or bulk assignment may touch
+BULK_MAX_TASKS = 1000
+# Most suggestions one GET /tags/suggest call may ask for
+TAG_SUGGEST_MAX = 50
+# Most teams one GET /teams/stats call may ask for
+STATS_MAX_TEAMS = 500
+# Idle event streams get a keep-alive this often, in seconds
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+# serve.py sets up the schema once and turns this off in its workers
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "1") == "1"
+
+# Initialize the database on startup, unless a launcher already did (see serve.py)
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    if DB_INIT_ON_STARTUP:
+        init_db()
+    event_bus.start()
+    if ARCHIVE_INTERVAL_SECONDS > 0:
+        app.state.archiver = asyncio.ensure_future(run_periodically(SessionLocal, on_archived=invalidate_task_listings))
+    if REMINDERS_ENABLED:
+        app.state.reminders = asyncio.ensure_future(reminder_scheduler.run(SessionLocal))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    event_bus.stop()
+    for name in ("archiver", "reminders"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
 
 # Pydantic models for request/response
 class UserCreate(BaseModel):
@@ -54,6 +107,11 @@ class TagResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TagSuggestion(BaseModel):
+    tag_id: int
+    name: str
+    usage_count: int
+
 class TaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -62,6 +120,7 @@ class TaskCreate(BaseModel):
     uid: str
     team_id: Optional[int] = None
     tags: Optional[List[str]] = None
+
 class PersonalTaskResponse(BaseModel):
     task_id: int
     title: str
@@ -92,6 +151,61 @@ class TeamTaskResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkTaskResult(BaseModel):
+    index: int
+    status: str
+    task: Optional[PersonalTaskResponse] = None
+    detail: Optional[str] = None
+
+class TaskSearchResult(BaseModel):
+    task_id: int
+    title: str
+    status: str
+    due_date: Optional[date]
+    created_by: Optional[int]
+    team_id: Optional[int]
+    score: float
+    title_highlight: Optional[str] = None
+    description_snippet: Optional[str] = None
+
+class SyncTask(BaseModel):
+    task_id: int
+    title: str
+    description: Optional[str]
+    status: str
+    due_date: Optional[date]
+    created_at: datetime
+    updated_at: datetime
+    created_by: Optional[int]
+    team_id: Optional[int]
+    assignee_ids: List[int] = []
+    tags: List[TagResponse] = []
+
+    class Config:
+        from_attributes = True
+
+class SyncDeletion(BaseModel):
+    kind: str
+    task_id: int
+    user_id: Optional[int] = None
+    deleted_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class SyncResponse(BaseModel):
+    tasks: List[SyncTask]
+    deleted: List[SyncDeletion]
+    next_cursor: str
+    has_more: bool
+
+class TeamStatsResponse(BaseModel):
+    team_id: int
+    task_count: int
+    tasks_by_status: Dict[str, int]
+    overdue_count: int
+    member_count: int
+
 class AuthRequest(BaseModel):
     uid: str
 
@@ -114,36 +228,261 @@ class TaskUpdate(BaseModel):
     tags: Optional[List[str]] = None
     assignee: Optional[List[int]] = None 
 
+# Tasks a bulk update applies to: a team's tasks or a user's personal tasks, optionally by status
+class BulkTaskFilter(BaseModel):
+    team_id: Optional[int] = None
+    uid: Optional[str] = None
+    status: Optional[str] = None
+
+class TaskBulkUpdate(BaseModel):
+    task_ids: Optional[List[int]] = None
+    filter: Optional[BulkTaskFilter] = None
+    status: Optional[str] = None
+    due_date: Optional[date] = None
+    tags: Optional[List[str]] = None
+
+class BulkUpdateResult(BaseModel):
+    updated: int
+    task_ids: List[int]
+
+class BulkAssignment(BaseModel):
+    task_ids: List[int]
+    assign: List[int] = []
+    unassign: List[int] = []
+
+class BulkAssignmentResult(BaseModel):
+    task_ids: List[int]
+    assigned: int
+    unassigned: int
+
+# Resolve a uid through the in-process user cache, falling back to the database
+def get_user_by_uid(db: Session, uid: str):
+    user = user_cache.get(uid)
+    if user is None:
+        db_user = db.query(User).filter(User.uid == uid).first()
+        if db_user is None:
+            return None
+        user = user_cache.put(db_user)
+    return user
+
+# Personal tasks of a user, in Task or ArchivedTask
+def personal_tasks_filter(user_id: int, model=Task):
+    return and_(model.created_by == user_id, or_(model.team_id == None, model.team_id == ''))
+
+# Row count of the archived tasks matching where, as a column for a listing's version stamp;
+# archived tasks never change, they are only added and deleted
+def archived_count(where):
+    return select(func.count()).select_from(ArchivedTask).where(where).scalar_subquery()
+
+# Rows of Task or Tombstone a user syncs: their personal tasks and their teams' tasks
+def sync_scope_filter(model, user_id: int):
+    team_ids = select(TeamMember.team_id).filter(TeamMember.user_id == user_id)
+    return or_(
+        and_(model.created_by == user_id, or_(model.team_id == None, model.team_id == '')),
+        model.team_id.in_(team_ids)
+    )
+
+# Ids among user_ids that exist, with one IN query
+def existing_user_ids(db: Session, user_ids):
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    return set(db.scalars(select(User.user_id).filter(User.user_id.in_(user_ids))))
+
+# Multi-row INSERT ... ON CONFLICT DO NOTHING for the session's database
+def insert_or_ignore(db: Session, model):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model.__table__).on_conflict_do_nothing()
+
+# Assign (task_id, user_id) pairs with one multi-row insert; pairs already assigned are skipped
+def insert_assignees(db: Session, pairs):
+    if pairs:
+        db.execute(insert_or_ignore(db, TaskAssignee), [{"task_id": task_id, "user_id": user_id} for task_id, user_id in pairs])
+
+# Tags for a bulk write as {name: tag dict}, given {name: owner user_id}. Existing tags are
+# matched by name, as in create_task, with one IN query; missing ones are created with one
+# multi-row INSERT.
+def resolve_tags(db: Session, owners):
+    tags_by_name = {}
+    if not owners:
+        return tags_by_name
+    for tag in db.query(*columns(Tag, TAG_FIELDS)).filter(Tag.name.in_(owners)):
+        tags_by_name.setdefault(tag.name, dict(zip(TAG_FIELDS, tag)))
+    missing = [{"name": name, "user_id": user_id, "team_id": None} for name, user_id in owners.items() if name not in tags_by_name]
+    if missing:
+        for row in db.execute(insert(Tag).returning(*columns(Tag, TAG_FIELDS)), missing):
+            tags_by_name[row.name] = dict(zip(TAG_FIELDS, row))
+    return tags_by_name
+
+# Serve a task listing through the response cache. The ETag comes from a cheap version
+# stamp (latest updated_at and row count of the scope); a matching If-None-Match gets a
+# 304, and an unchanged stamp reuses the rendered body. build() returns (body, headers).
+# check(), when given, raises for a scope that doesn't exist; it runs before a 304 unless
+# a cached body already shows the scope exists, and build() runs it again.
+def cached_listing(request: Request, scope, variant, stamp_query, build, check=None):
+    cached = response_cache.get(scope, variant)
+    if response_cache.is_trusted(cached):
+        etag = cached.etag
+    else:
+        etag = make_etag(scope, variant, tuple(stamp_query.one()))
+        if cached is not None and cached.etag != etag:
+            cached = None
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        # "If-None-Match: *" matches any ETag, even one of a team that doesn't exist
+        if cached is None and check is not None:
+            check()
+        return Response(status_code=304, headers={"ETag": etag})
+    if cached is None:
+        body, headers = build()
+        cached = response_cache.put(scope, variant, etag, body, headers)
+    return Response(content=cached.body, media_type="application/json", headers={**cached.headers, "ETag": etag})
+
+# Push a change event to the task's team stream; personal tasks have no stream. Call after commit.
+def publish_task_event(kind: str, task_id: int, team_id: Optional[int], updated_at: Optional[datetime] = None, **fields):
+    if team_id is not None:
+        event_bus.publish(team_id, {"type": kind, "task_id": task_id, "team_id": team_id, "updated_at": updated_at, **fields})
+
+# Make tags attached to tasks suggestable in the tasks' scopes, given ((created_by, team_id),
+# tag dicts) pairs; only scopes already in the tag index are touched. Call after commit.
+def index_task_tags(tagged):
+    for (created_by, team_id), tags in tagged:
+        tag_index.add(task_tag_scope(created_by, team_id), [(tag["tag_id"], tag["name"]) for tag in tags])
+
+# Drop cached listings that may include tasks with these (created_by, team_id) pairs; call after commit
+def invalidate_task_listings(owners):
+    scopes = set()
+    for created_by, team_id in owners:
+        scopes.add(("user", created_by))
+        if team_id is not None:
+            scopes.add(("team", team_id))
+    response_cache.invalidate(*scopes)
+
 # Auth endpoint to check if user exists
 @app.post("/auth", response_model=UserResponse, status_code=200)
+@db_endpoint
 def authenticate_user(auth_request: AuthRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.uid == auth_request.uid).first()
+    user = get_user_by_uid(db, auth_request.uid)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserResponse.from_orm(user)
+    return ORJSONResponse(as_dict(user, USER_FIELDS))
+
+# Full-text search over task titles and descriptions within a user's or a team's tasks.
+# Declared before /tasks/{uid} so "search" isn't taken for a uid.
+@app.get("/tasks/search", response_model=List[TaskSearchResult], status_code=200)
+@db_endpoint
+def search_tasks_endpoint(
+    q: str = Query(..., min_length=1),
+    uid: Optional[str] = None,
+    team_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    highlight: bool = False,
+    db: Session = Depends(get_db),
+):
+    if not supports_search(db.get_bind()):
+        raise HTTPException(status_code=501, detail="Search requires SQLite FTS5")
+    if (uid is None) == (team_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of uid or team_id")
+    user_id = None
+    if uid is not None:
+        user = get_user_by_uid(db, uid)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_id = user.user_id
+    elif db.get(Team, team_id) is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    rows = search_tasks(db, q, user_id=user_id, team_id=team_id, limit=limit, offset=offset, highlight=highlight)
+    return ORJSONResponse(rows)
 
-# Get personal tasks by specific user
+# Get personal tasks by specific user, paginated by (created_at, task_id)
 @app.get("/tasks/{uid}", response_model=List[PersonalTaskResponse], status_code=200)
-def get_tasks_by_uid(uid: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.uid == uid).first()
+@db_endpoint
+def get_tasks_by_uid(
+    uid: str,
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = None,
+    status: Optional[str] = None,
+    due_before: Optional[date] = None,
+    due_after: Optional[date] = None,
+    include_archived: bool = False,
+    db: Session = Depends(get_db),
+):
+    user = get_user_by_uid(db, uid)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    tasks = db.query(Task).filter(
-        Task.created_by == user.user_id,
-        or_(Task.team_id == None, Task.team_id == '')
-    ).all()
-    task_responses = []
-    for task in tasks:
-        task_response = PersonalTaskResponse.from_orm(task)
-        tags = db.query(Tag).join(TaskTag).filter(TaskTag.task_id == task.task_id).all()
-        task_response.tags = [TagResponse.from_orm(tag) for tag in tags]
-        task_responses.append(task_response)
-    return task_responses
 
-# Create a new personal task
+    def page(model):
+        query = db.query(*columns(model, TASK_FIELDS)).filter(personal_tasks_filter(user.user_id, model))
+        if status is not None:
+            query = query.filter(model.status == status)
+        if due_before is not None:
+            query = query.filter(model.due_date <= due_before)
+        if due_after is not None:
+            query = query.filter(model.due_date >= due_after)
+        if after is not None:
+            try:
+                after_created_at, after_task_id = decode_cursor(after, datetime, int)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            query = query.filter(tuple_(model.created_at, model.task_id) > (after_created_at, after_task_id))
+        return query.order_by(model.created_at, model.task_id).limit(limit).all()
+
+    def build():
+        tasks = personal_task_dicts(db, page(Task))
+        # A page from each table, merged in cursor order
+        if include_archived:
+            tasks += personal_task_dicts(db, page(ArchivedTask), archived=True)
+            tasks = sorted(tasks, key=lambda task: (task["created_at"], task["task_id"]))[:limit]
+
+        # A full page means there may be more rows; hand back the position of the last one
+        headers = {}
+        if len(tasks) == limit:
+            headers["X-Next-Cursor"] = encode_cursor(tasks[-1]["created_at"], tasks[-1]["task_id"])
+        return dumps(tasks), headers
+
+    stamp_query = db.query(func.max(Task.updated_at), func.count()).filter(personal_tasks_filter(user.user_id))
+    if include_archived:
+        stamp_query = stamp_query.add_columns(archived_count(personal_tasks_filter(user.user_id, ArchivedTask)))
+    variant = (limit, after, status, due_before, due_after, include_archived)
+    return cached_listing(request, ("user", user.user_id), variant, stamp_query, build)
+
+# Open personal tasks due from today to days ahead, soonest first. Cached like the
+# personal listing, with the date in the variant so the window moves at midnight.
+@app.get("/tasks/{uid}/upcoming", response_model=List[PersonalTaskResponse], status_code=200)
+@db_endpoint
+def get_upcoming_tasks(
+    uid: str,
+    request: Request,
+    days: int = Query(7, ge=0, le=365),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    user = get_user_by_uid(db, uid)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    today = date.today()
+
+    def build():
+        rows = db.query(*columns(Task, TASK_FIELDS)).filter(
+            personal_tasks_filter(user.user_id),
+            Task.due_date >= today,
+            Task.due_date <= today + timedelta(days=days),
+            Task.status.notin_(DONE_STATUSES)
+        ).order_by(Task.due_date, Task.task_id).limit(limit).all()
+        return dumps(personal_task_dicts(db, rows)), {}
+
+    stamp_query = db.query(func.max(Task.updated_at), func.count()).filter(personal_tasks_filter(user.user_id))
+    return cached_listing(request, ("user", user.user_id), ("upcoming", today, days, limit), stamp_query, build)
+
+# Create a new personal task, with its tags, in one transaction
 @app.post("/tasks", response_model= PersonalTaskResponse, status_code=200)
+@db_endpoint
 def create_task(task: TaskCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.uid == task.uid).first()
+    user = get_user_by_uid(db, task.uid)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -156,26 +495,156 @@ def create_task(task: TaskCreate, db: Session = Depends(get_db)):
         team_id=task.team_id
     )
     db.add(new_task)
+    db.flush()
+
+    # Repeated names are one tag, as in create_tasks_bulk
+    tag_names = list(dict.fromkeys(task.tags or []))
+    tags_by_name = resolve_tags(db, dict.fromkeys(tag_names, user.user_id))
+    tags = [tags_by_name[name] for name in tag_names]
+    if tags:
+        db.execute(insert(TaskTag), [{"task_id": new_task.task_id, "tag_id": tag["tag_id"]} for tag in tags])
+    body = as_dict(new_task, TASK_FIELDS)
+    body["tags"] = tags
     db.commit()
-    db.refresh(new_task)
-    
-    if task.tags is not None:
-        for tag_name in task.tags:
-            tag = db.query(Tag).filter(Tag.name == tag_name).first()
-            if not tag:
-                new_tag = Tag(name=tag_name, user_id=new_task.created_by)
-                db.add(new_tag)
-                db.flush()
-            task_tag = TaskTag(task_id = new_task.task_id, tag_id=new_tag.tag_id)
-            db.add(task_tag)
+    invalidate_task_listings([(body["created_by"], task.team_id)])
+    publish_task_event("task.created", body["task_id"], task.team_id, body["updated_at"])
+    index_task_tags([((body["created_by"], task.team_id), tags)])
+    return ORJSONResponse(body)
+
+# Create many tasks in a single transaction.
+# Creators and existing tags are resolved with one IN query each; missing tags, tasks
+# and task_tags rows are then written with one multi-row INSERT per table.
+@app.post("/tasks/bulk", response_model=List[BulkTaskResult], status_code=200)
+@db_endpoint
+def create_tasks_bulk(tasks: List[TaskCreate], db: Session = Depends(get_db)):
+    if len(tasks) > BULK_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_TASKS} tasks per request")
+    user_ids = {}
+    for uid in {task.uid for task in tasks}:
+        user = user_cache.get(uid)
+        if user is not None:
+            user_ids[uid] = user.user_id
+    uncached = {task.uid for task in tasks} - user_ids.keys()
+    if uncached:
+        for user in db.query(User).filter(User.uid.in_(uncached)).all():
+            user_ids[user.uid] = user_cache.put(user).user_id
 
+    results = [{"index": index, "status": "error", "task": None, "detail": "User not found"} for index in range(len(tasks))]
+    accepted = [(index, task) for index, task in enumerate(tasks) if task.uid in user_ids]
+    if not accepted:
+        return ORJSONResponse(results)
+
+    # New tags belong to the first task's creator
+    tag_names = {}
+    for _, task in accepted:
+        for tag_name in task.tags or []:
+            tag_names.setdefault(tag_name, user_ids[task.uid])
+    tags_by_name = resolve_tags(db, tag_names)
+
+    now = datetime.now()
+    rows = [
+        {
+            "title": task.title,
+            "description": task.description,
+            "status": task.status,
+            "due_date": task.due_date,
+            "created_at": now,
+            "updated_at": now,
+            "created_by": user_ids[task.uid],
+            "team_id": task.team_id,
+        }
+        for _, task in accepted
+    ]
+    # Ids come back in the order of rows, whichever way the driver batches the INSERT
+    task_ids = db.execute(insert(Task).returning(Task.task_id, sort_by_parameter_order=True), rows).scalars().all()
+
+    task_tag_rows = []
+    for (index, task), row, task_id in zip(accepted, rows, task_ids):
+        tags = [tags_by_name[tag_name] for tag_name in dict.fromkeys(task.tags or [])]
+        task_tag_rows.extend({"task_id": task_id, "tag_id": tag["tag_id"]} for tag in tags)
+        task_response = {field: task_id if field == "task_id" else row[field] for field in TASK_FIELDS}
+        task_response["tags"] = tags
+        results[index] = {"index": index, "status": "created", "task": task_response, "detail": None}
+    if task_tag_rows:
+        db.execute(insert(TaskTag), task_tag_rows)
     db.commit()
-    db.refresh(new_task)
+    invalidate_task_listings((row["created_by"], row["team_id"]) for row in rows)
+    index_task_tags(((row["created_by"], row["team_id"]), results[index]["task"]["tags"]) for (index, _), row in zip(accepted, rows))
+    for row, task_id in zip(rows, task_ids):
+        publish_task_event("task.created", task_id, row["team_id"], row["updated_at"])
+    return ORJSONResponse(results)
+
+# Apply status, due_date and tag changes to many tasks, given as task_ids or a filter.
+# The tasks are read with one query, then changed with one UPDATE ... WHERE task_id IN (...)
+# and, for tags, one DELETE and one multi-row INSERT into task_tags.
+@app.patch("/tasks/bulk", response_model=BulkUpdateResult, status_code=200)
+@db_endpoint
+def update_tasks_bulk(changes: TaskBulkUpdate, db: Session = Depends(get_db)):
+    if (changes.task_ids is None) == (changes.filter is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of task_ids or filter")
+    if changes.status is None and changes.due_date is None and changes.tags is None:
+        raise HTTPException(status_code=400, detail="Nothing to update")
 
-    return PersonalTaskResponse.from_orm(new_task)
+    query = select(Task.task_id, Task.created_by, Task.team_id, Task.status, Task.due_date)
+    if changes.task_ids is not None:
+        requested = list(dict.fromkeys(changes.task_ids))
+        if len(requested) > BULK_MAX_TASKS:
+            raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_TASKS} tasks per request")
+        query = query.filter(Task.task_id.in_(requested))
+    else:
+        scope = changes.filter
+        if (scope.team_id is None) == (scope.uid is None):
+            raise HTTPException(status_code=400, detail="Filter needs exactly one of team_id or uid")
+        if scope.uid is not None:
+            user = get_user_by_uid(db, scope.uid)
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            query = query.filter(personal_tasks_filter(user.user_id))
+        else:
+            query = query.filter(Task.team_id == scope.team_id)
+        if scope.status is not None:
+            query = query.filter(Task.status == scope.status)
+        query = query.limit(BULK_MAX_TASKS + 1)
+    tasks = db.execute(query).all()
+    if changes.task_ids is not None:
+        missing = set(requested) - {task.task_id for task in tasks}
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Tasks not found: {sorted(missing)}")
+    elif len(tasks) > BULK_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"Filter matches more than {BULK_MAX_TASKS} tasks")
+    task_ids = [task.task_id for task in tasks]
+    if not task_ids:
+        return ORJSONResponse({"updated": 0, "task_ids": []})
+
+    now = datetime.now()
+    values = {"updated_at": now}
+    if changes.status is not None:
+        values["status"] = changes.status
+    if changes.due_date is not None:
+        values["due_date"] = changes.due_date
+    db.execute(update(Task).where(Task.task_id.in_(task_ids)).values(**values).execution_options(synchronize_session=False))
+
+    # Tags are replaced, as in update_task; new tags belong to the first task's creator
+    if changes.tags is not None:
+        tag_names = list(dict.fromkeys(changes.tags))
+        tags_by_name = resolve_tags(db, dict.fromkeys(tag_names, tasks[0].created_by))
+        db.execute(delete(TaskTag).where(TaskTag.task_id.in_(task_ids)))
+        task_tag_rows = [{"task_id": task_id, "tag_id": tags_by_name[name]["tag_id"]} for task_id in task_ids for name in tag_names]
+        if task_tag_rows:
+            db.execute(insert(TaskTag), task_tag_rows)
+
+    db.commit()
+    invalidate_task_listings((task.created_by, task.team_id) for task in tasks)
+    if changes.tags is not None:
+        tags = [tags_by_name[name] for name in tag_names]
+        index_task_tags((owner, tags) for owner in {(task.created_by, task.team_id) for task in tasks})
+    for task in tasks:
+        publish_task_event("task.updated", task.task_id, task.team_id, now)
+    return ORJSONResponse({"updated": len(task_ids), "task_ids": task_ids})
 
 # Update personal task
 @app.put("/tasks/{task_id}", response_model=PersonalTaskResponse, status_code=200)
+@db_endpoint
 def update_task(task: TaskUpdate, task_id: int, db: Session = Depends(get_db)):
     task_to_update = db.query(Task).filter(Task.task_id == task_id).first()
     if not task_to_update:
@@ -190,46 +659,62 @@ def update_task(task: TaskUpdate, task_id: int, db: Session = Depends(get_db)):
         task_to_update.status = task.status
     if task.due_date is not None:
         task_to_update.due_date = task.due_date
+    # Tag and assignee changes don't touch the row, but listings' version stamps rely on it
+    task_to_update.updated_at = datetime.now()
 
     # Update tags if provided
     if task.tags is not None:
         db.query(TaskTag).filter(TaskTag.task_id == task_id).delete()
-        for tag_name in task.tags:
-            tag = db.query(Tag).filter(Tag.name == tag_name).first()
-            if not tag:
-                new_tag = Tag(name=tag_name, user_id=task_to_update.created_by)
-                db.add(new_tag)
-                db.flush()
-                tag = new_tag
-            task_tag = TaskTag(task_id=task_id, tag_id=tag.tag_id)
-            db.add(task_tag)
+        tag_names = list(dict.fromkeys(task.tags))
+        tags_by_name = resolve_tags(db, dict.fromkeys(tag_names, task_to_update.created_by))
+        if tag_names:
+            db.execute(insert(TaskTag), [{"task_id": task_id, "tag_id": tags_by_name[name]["tag_id"]} for name in tag_names])
 
     # Update assignees if provided
     if task.assignee is not None:
-        db.query(TaskAssignee).filter(TaskAssignee.task_id == task_id).delete()
-        for user_id in task.assignee:
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if user:
-                task_assignee = TaskAssignee(task_id=task_id, user_id=user_id)
-                db.add(task_assignee)
+        # Unknown user ids are skipped
+        previous = set(db.scalars(select(TaskAssignee.user_id).filter(TaskAssignee.task_id == task_id)))
+        assigned = existing_user_ids(db, task.assignee)
+        removed = previous - assigned
+        if removed:
+            db.execute(delete(TaskAssignee).where(TaskAssignee.task_id == task_id, TaskAssignee.user_id.in_(removed)))
+        insert_assignees(db, [(task_id, user_id) for user_id in sorted(assigned - previous)])
+        db.add_all(assignee_removed(task_to_update, user_id) for user_id in sorted(removed))
 
     db.commit()
     db.refresh(task_to_update)
+    invalidate_task_listings([(task_to_update.created_by, task_to_update.team_id)])
+    publish_task_event("task.updated", task_id, task_to_update.team_id, task_to_update.updated_at)
 
-    return TeamTaskResponse.from_orm(task_to_update)
+    body = personal_task_dict(task_to_update)
+    if task.tags is not None:
+        index_task_tags([((task_to_update.created_by, task_to_update.team_id), body["tags"])])
+    return ORJSONResponse(body)
 
 # Delete task endpoint
 @app.delete("/tasks/{task_id}", status_code=204)
+@db_endpoint
 def delete_task(task_id: int, db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.task_id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    if task is not None:
+        delete_task_links(db, [task_id])
+    else:
+        # Archived tasks can still be deleted
+        task = db.query(ArchivedTask).filter(ArchivedTask.task_id == task_id).first()
+        if task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        delete_task_links(db, [task_id], archived=True)
+    owner = (task.created_by, task.team_id)
+    db.add(task_deleted(task))
     db.delete(task)
     db.commit()
+    invalidate_task_listings([owner])
+    publish_task_event("task.deleted", task_id, owner[1])
     return None
 
 # Create User
 @app.post("/user", response_model=UserResponse, status_code = 200)
+@db_endpoint
 def create_user(user : UserCreate, db: Session = Depends(get_db)):
     check_user = db.query(User).filter(User.email == user.email).first() 
 
@@ -239,27 +724,161 @@ def create_user(user : UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
-    return UserResponse.from_orm(new_user)
+    user_cache.invalidate(new_user.uid)
+    return ORJSONResponse(as_dict(new_user, USER_FIELDS))
+
 
+def team_tasks_stream_query(team_id: int, model=Task):
+    return select(*columns(model, TASK_FIELDS)).filter(
+        model.team_id == team_id
+    ).order_by(model.task_id).execution_options(yield_per=STREAM_BATCH_SIZE)
 
-# Get tasks from a specific team
+# Models a listing or export reads, live tasks first
+def task_models(include_archived: bool):
+    return (Task, ArchivedTask) if include_archived else (Task,)
+
+def team_dict(db: Session, team_id: int):
+    team = db.get(Team, team_id)
+    return as_dict(team, TEAM_FIELDS) if team else None
+
+# Stream a team's tasks as NDJSON, one serialized task per line and one chunk per batch.
+# Uses its own session: the body is sent after the endpoint has returned and closed the
+# request's (see get_team_tasks).
+def stream_team_tasks(team_id: int, include_archived: bool = False):
+    db = ReadSessionLocal()
+    try:
+        team = team_dict(db, team_id)
+        for model in task_models(include_archived):
+            for rows in db.execute(team_tasks_stream_query(team_id, model)).partitions():
+                yield dumps_lines(team_task_dicts(db, rows, team, archived=model is ArchivedTask))
+    finally:
+        db.close()
+
+# Async-mode counterpart of stream_team_tasks; each batch's tags and assignees load through the sync facade
+async def astream_team_tasks(team_id: int, include_archived: bool = False):
+    async with ReadSessionLocal() as db:
+        team = await db.run_sync(team_dict, team_id)
+        for model in task_models(include_archived):
+            archived = model is ArchivedTask
+            result = await db.stream(team_tasks_stream_query(team_id, model))
+            async for rows in result.partitions():
+                yield await db.run_sync(lambda session: dumps_lines(team_task_dicts(session, rows, team, archived=archived)))
+
+# Open team tasks whose due date has passed, most overdue first
+@app.get("/team-tasks/{team_id}/overdue", response_model=list[TeamTaskResponse], status_code=200)
+@db_endpoint
+def get_overdue_team_tasks(team_id: int, request: Request, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    today = date.today()
+
+    def check_team():
+        team = team_dict(db, team_id)
+        if not team:
+            raise HTTPException(status_code=404, detail="Team not found")
+        return team
+
+    def build():
+        team = check_team()
+        rows = db.query(*columns(Task, TASK_FIELDS)).filter(
+            Task.team_id == team_id,
+            Task.due_date < today,
+            Task.status.notin_(DONE_STATUSES)
+        ).order_by(Task.due_date, Task.task_id).limit(limit).all()
+        return dumps(team_task_dicts(db, rows, team)), {}
+
+    stamp_query = db.query(func.max(Task.updated_at), func.count()).filter(Task.team_id == team_id)
+    return cached_listing(request, ("team", team_id), ("overdue", today, limit), stamp_query, build, check_team)
+
+# Get tasks from a specific team. The request session is function-scoped, so it goes
+# back to the pool when the endpoint returns instead of staying out while a stream is sent.
 @app.get("/team-tasks/{team_id}", response_model=list[TeamTaskResponse], status_code=200)
-def get_team_tasks(team_id: int, db: Session = Depends(get_db)):
-    team = db.query(Team).filter(Team.team_id == team_id).first()
-    if not team:
-        raise HTTPException(status_code=404, detail="Team not found")
-    tasks = db.query(Task).filter(Task.team_id == team_id).all()
-    team_task_responses = []
-    for task in tasks:
-        team_task_response = TeamTaskResponse.from_orm(task)
-        team_task_response.team = TeamResponse.from_orm(task.team) if task.team else None
-        team_task_response.assignees = [UserResponse.from_orm(assignee) for assignee in task.assignees]
-        team_task_response.tags = [TagResponse.from_orm(tag) for tag in task.tags]
-        team_task_responses.append(team_task_response)
-    return team_task_responses
+@db_endpoint
+def get_team_tasks(
+    team_id: int,
+    request: Request,
+    stream: bool = False,
+    include_archived: bool = False,
+    db: Session = Depends(get_db, scope="function"),
+):
+    def check_team():
+        team = team_dict(db, team_id)
+        if not team:
+            raise HTTPException(status_code=404, detail="Team not found")
+        return team
+
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        check_team()
+        stream_tasks = astream_team_tasks if ASYNC_MODE else stream_team_tasks
+        return StreamingResponse(stream_tasks(team_id, include_archived), media_type=NDJSON_MEDIA_TYPE)
+
+    # Checked when rendering, and before a 304 that no cached body backs; an unchanged
+    # poll of a cached listing costs just the version stamp query
+    def build():
+        team = check_team()
+        tasks = []
+        for model in task_models(include_archived):
+            rows = db.query(*columns(model, TASK_FIELDS)).filter(model.team_id == team_id).all()
+            tasks += team_task_dicts(db, rows, team, archived=model is ArchivedTask)
+        return dumps(tasks), {}
+
+    stamp_query = db.query(func.max(Task.updated_at), func.count()).filter(Task.team_id == team_id)
+    if include_archived:
+        stamp_query = stamp_query.add_columns(archived_count(ArchivedTask.team_id == team_id))
+    return cached_listing(request, ("team", team_id), include_archived or None, stamp_query, build, check_team)
+
+# Stream export chunks with their own session, as stream_team_tasks does; export_tasks has
+# closed the request's by the time the body is sent
+def stream_export(writer, queries):
+    db = ReadSessionLocal()
+    try:
+        yield from export_chunks(db, writer, queries)
+    finally:
+        db.close()
+
+async def astream_export(writer, queries):
+    async with ReadSessionLocal() as db:
+        async for chunk in aexport_chunks(db, writer, queries):
+            yield chunk
+
+# Export a user's personal tasks or a team's tasks, with tag names and assignee ids, as
+# CSV, JSON Lines or Parquet. Streamed in batches, so memory doesn't grow with the export;
+# the request session is function-scoped, so it is released before streaming starts.
+@app.get("/export/tasks", status_code=200)
+@db_endpoint
+def export_tasks(
+    uid: Optional[str] = None,
+    team_id: Optional[int] = None,
+    format: str = Query("jsonl", pattern="^(csv|jsonl|parquet)$"),
+    include_archived: bool = False,
+    db: Session = Depends(get_db, scope="function"),
+):
+    if (uid is None) == (team_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of uid or team_id")
+    if uid is not None:
+        user = get_user_by_uid(db, uid)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        scope_filter = lambda model: personal_tasks_filter(user.user_id, model)
+        filename = f"tasks-user-{user.user_id}"
+    else:
+        if db.get(Team, team_id) is None:
+            raise HTTPException(status_code=404, detail="Team not found")
+        scope_filter = lambda model: model.team_id == team_id
+        filename = f"tasks-team-{team_id}"
+    if format == "parquet" and not supports_parquet():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    queries = [(export_query(model, scope_filter(model)), model is ArchivedTask) for model in task_models(include_archived)]
+    writer = EXPORT_WRITERS[format]()
+    stream = astream_export if ASYNC_MODE else stream_export
+    return StreamingResponse(
+        stream(writer, queries),
+        media_type=writer.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{writer.extension}"'}
+    )
 
 # Create a new tag
 @app.post("/tags", response_model=TagResponse, status_code=201)
+@db_endpoint
 def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.user_id == tag.user_id).first()
     if user is None:
@@ -272,35 +891,141 @@ def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
     db.add(new_tag)
     db.commit()
     db.refresh(new_tag)
-    return TagResponse.from_orm(new_tag)
+    body = as_dict(new_tag, TAG_FIELDS)
+    index_task_tags([((new_tag.user_id, new_tag.team_id), [body])])
+    return ORJSONResponse(body, status_code=201)
+
+# Tag names starting with prefix among a user's personal tags or a team's tags, most used
+# first. Served from the in-memory tag index; the database is only read to load a scope.
+@app.get("/tags/suggest", response_model=List[TagSuggestion], status_code=200)
+@db_endpoint
+def suggest_tags(
+    prefix: str = Query("", max_length=50),
+    uid: Optional[str] = None,
+    team_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=TAG_SUGGEST_MAX),
+    db: Session = Depends(get_db),
+):
+    if (uid is None) == (team_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of uid or team_id")
+    if uid is not None:
+        user = get_user_by_uid(db, uid)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        scope = ("user", user.user_id)
+    else:
+        scope = ("team", team_id)
+    tags = tag_index.get(scope)
+    if tags is None:
+        if team_id is not None and db.get(Team, team_id) is None:
+            raise HTTPException(status_code=404, detail="Team not found")
+        tags = tag_index.put(scope, load_scope_tags(db, scope))
+    return ORJSONResponse(tags.suggest(prefix, limit))
+
+# Dashboard stats for many teams, e.g. ?team_id=1&team_id=2, read from the write-maintained
+# counters. Unknown teams are left out. Declared before /teams/{uid} so "stats" isn't taken for a uid.
+@app.get("/teams/stats", response_model=List[TeamStatsResponse], status_code=200)
+@db_endpoint
+def get_teams_stats(team_id: List[int] = Query(..., max_length=STATS_MAX_TEAMS), db: Session = Depends(get_db)):
+    known = set(db.scalars(select(Team.team_id).filter(Team.team_id.in_(team_id))))
+    stats = read_team_stats(db, [requested for requested in dict.fromkeys(team_id) if requested in known])
+    return ORJSONResponse(list(stats.values()))
+
+# Task counts by status, overdue count and member count of one team
+@app.get("/teams/{team_id}/stats", response_model=TeamStatsResponse, status_code=200)
+@db_endpoint
+def get_team_stats(team_id: int, db: Session = Depends(get_db)):
+    if db.get(Team, team_id) is None:
+        raise HTTPException(status_code=404, detail="Team not found")
+    return ORJSONResponse(read_team_stats(db, [team_id])[team_id])
 
 # Get teams by user ID
 @app.get("/teams/{uid}", response_model=list[TeamResponse], status_code=200)
+@db_endpoint
 def get_teams_by_uid(uid: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.uid == uid).first()
+    user = get_user_by_uid(db, uid)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    teams = user.teams
-    team_responses = [TeamResponse.from_orm(team) for team in teams]
-    return team_responses
+    teams = db.query(*columns(Team, TEAM_FIELDS)).join(TeamMember).filter(TeamMember.user_id == user.user_id).all()
+    return ORJSONResponse([dict(zip(TEAM_FIELDS, team)) for team in teams])
 
 # Add task assignees
 @app.post("/tasks/assignees", status_code=201)
+@db_endpoint
 def add_task_assignees(assigned_members: AddAssignedMembers, db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.task_id == assigned_members.task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    found = existing_user_ids(db, assigned_members.assignees)
     for user_id in assigned_members.assignees:
-        user = db.query(User).filter(User.user_id == user_id).first()
-        if not user:
+        if user_id not in found:
             raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
-        task_assignee = TaskAssignee(task_id=assigned_members.task_id, user_id=user_id)
-        db.add(task_assignee)
+    insert_assignees(db, [(task.task_id, user_id) for user_id in dict.fromkeys(assigned_members.assignees)])
+    task.updated_at = updated_at = datetime.now()
+    owner = (task.created_by, task.team_id)
     db.commit()
+    invalidate_task_listings([owner])
+    publish_task_event("assignees.added", assigned_members.task_id, owner[1], updated_at, user_ids=assigned_members.assignees)
     return {"message": f"Assigned members added to Task {assigned_members.task_id}"}
 
+# Assign and unassign users on many tasks. Tasks, users and current assignments are each read
+# with one IN query; new assignments go in with one multi-row insert that skips pairs
+# assigned concurrently, and removals with one DELETE.
+@app.post("/tasks/assignees/bulk", response_model=BulkAssignmentResult, status_code=200)
+@db_endpoint
+def assign_tasks_bulk(assignment: BulkAssignment, db: Session = Depends(get_db)):
+    task_ids = list(dict.fromkeys(assignment.task_ids))
+    assign, unassign = set(assignment.assign), set(assignment.unassign)
+    if not task_ids or len(task_ids) > BULK_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {BULK_MAX_TASKS} task_ids")
+    if not assign and not unassign:
+        raise HTTPException(status_code=400, detail="Nothing to assign or unassign")
+    if assign & unassign:
+        raise HTTPException(status_code=400, detail=f"Users both assigned and unassigned: {sorted(assign & unassign)}")
+
+    tasks = {task.task_id: task for task in db.execute(
+        select(Task.task_id, Task.created_by, Task.team_id).filter(Task.task_id.in_(task_ids))
+    )}
+    missing_tasks = set(task_ids) - tasks.keys()
+    if missing_tasks:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {sorted(missing_tasks)}")
+    missing_users = (assign | unassign) - existing_user_ids(db, assign | unassign)
+    if missing_users:
+        raise HTTPException(status_code=404, detail=f"Users not found: {sorted(missing_users)}")
+
+    current = set(db.execute(select(TaskAssignee.task_id, TaskAssignee.user_id).filter(
+        TaskAssignee.task_id.in_(task_ids),
+        TaskAssignee.user_id.in_(assign | unassign)
+    )).tuples())
+    added = [(task_id, user_id) for task_id in task_ids for user_id in sorted(assign) if (task_id, user_id) not in current]
+    removed = sorted(pair for pair in current if pair[1] in unassign)
+    insert_assignees(db, added)
+    if removed:
+        assignees = TaskAssignee.__table__
+        db.execute(
+            delete(assignees).where(assignees.c.task_id == bindparam("pair_task_id"), assignees.c.user_id == bindparam("pair_user_id")),
+            [{"pair_task_id": task_id, "pair_user_id": user_id} for task_id, user_id in removed]
+        )
+        db.add_all(assignee_removed(tasks[task_id], user_id) for task_id, user_id in removed)
+    changed = sorted({task_id for task_id, _ in added} | {task_id for task_id, _ in removed})
+    now = datetime.now()
+    if changed:
+        db.execute(update(Task).where(Task.task_id.in_(changed)).values(updated_at=now).execution_options(synchronize_session=False))
+    db.commit()
+
+    invalidate_task_listings((tasks[task_id].created_by, tasks[task_id].team_id) for task_id in changed)
+    added_by_task = {}
+    for task_id, user_id in added:
+        added_by_task.setdefault(task_id, []).append(user_id)
+    for task_id, user_ids in added_by_task.items():
+        publish_task_event("assignees.added", task_id, tasks[task_id].team_id, now, user_ids=user_ids)
+    for task_id, user_id in removed:
+        publish_task_event("assignee.removed", task_id, tasks[task_id].team_id, now, user_id=user_id)
+    return ORJSONResponse({"task_ids": changed, "assigned": len(added), "unassigned": len(removed)})
+
 # Remove task assignee
 @app.delete("/tasks/{task_id}/assignees/{user_id}", status_code=200)
+@db_endpoint
 def remove_task_assignee(task_id: int, user_id: int, db: Session = Depends(get_db)):
     task = db.query(Task).filter(Task.task_id == task_id).first()
     if not task:
@@ -312,20 +1037,165 @@ def remove_task_assignee(task_id: int, user_id: int, db: Session = Depends(get_d
     if not task_assignee:
         raise HTTPException(status_code=404, detail="User is not assigned to this task")
     db.delete(task_assignee)
+    db.add(assignee_removed(task, user_id))
+    task.updated_at = updated_at = datetime.now()
+    owner = (task.created_by, task.team_id)
     db.commit()
+    invalidate_task_listings([owner])
+    publish_task_event("assignee.removed", task_id, owner[1], updated_at, user_id=user_id)
     return {"message": f"User {user_id} removed from Task {task_id}"}
 
 
+# Live change events for a team, as Server-Sent Events. Events carry ids and the change
+# type only; clients fetch the data through /sync, and do a full catch-up on "resync".
+# The team is checked with a short-lived session rather than the request's, which would
+# stay checked out of the pool for as long as the stream is open.
+@app.get("/teams/{team_id}/events", status_code=200)
+async def team_events(team_id: int):
+    if not await check_team_exists(team_id):
+        raise HTTPException(status_code=404, detail="Team not found")
+    return StreamingResponse(
+        sse_events(team_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def sse_events(team_id: int):
+    subscriber = event_bus.subscribe(team_id)
+    try:
+        yield ": connected\n\n"
+        while True:
+            message = await subscriber.get(EVENTS_HEARTBEAT_SECONDS)
+            yield f"data: {message}\n\n" if message is not None else ": keep-alive\n\n"
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+def team_exists(team_id: int):
+    db = ReadSessionLocal()
+    try:
+        return db.query(Team.team_id).filter(Team.team_id == team_id).first() is not None
+    finally:
+        db.close()
+
+async def ateam_exists(team_id: int):
+    async with ReadSessionLocal() as db:
+        return (await db.execute(select(Team.team_id).filter(Team.team_id == team_id))).first() is not None
+
+async def check_team_exists(team_id: int):
+    return await ateam_exists(team_id) if ASYNC_MODE else await run_in_threadpool(team_exists, team_id)
+
+# The same events over a WebSocket, one JSON text message per event
+@app.websocket("/teams/{team_id}/events")
+async def team_events_websocket(websocket: WebSocket, team_id: int):
+    if not await check_team_exists(team_id):
+        await websocket.close(code=4404, reason="Team not found")
+        return
+    await websocket.accept()
+    subscriber = event_bus.subscribe(team_id)
+
+    async def send_events():
+        while True:
+            message = await subscriber.get()
+            await websocket.send_text(message)
+
+    # Incoming messages are ignored; receiving is how a disconnect is noticed
+    try:
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(send_events)
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+            task_group.cancel_scope.cancel()
+    finally:
+        event_bus.unsubscribe(subscriber)
+
 # Get members by team_id
 @app.get("/teams/{team_id}/members", response_model=List[TeamMemberResponse], status_code=200)
+@db_endpoint
 def get_team_members(team_id: int, db: Session = Depends(get_db)):
     team = db.query(Team).filter(Team.team_id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
 
-    members = db.query(User).join(TeamMember).filter(TeamMember.team_id == team_id).all()
+    members = db.query(*columns(User, MEMBER_FIELDS)).join(TeamMember).filter(TeamMember.team_id == team_id).all()
     if not members:
         raise HTTPException(status_code=404, detail="No members found for this team")
 
-    member_responses = [TeamMemberResponse.from_orm(member) for member in members]
-    return member_responses
+    return ORJSONResponse([dict(zip(MEMBER_FIELDS, member)) for member in members])
+
+# Changes to a user's personal and team tasks since a cursor from an earlier call.
+# Changed tasks come back whole, with their tags and assignee ids, in change_seq (commit)
+# order; deletions come from tombstones. Without a cursor every task is returned, so a
+# client pages through a full sync first and then only fetches what changed.
+@app.get("/sync", response_model=SyncResponse, status_code=200)
+@db_endpoint
+def sync_tasks(
+    uid: str,
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    user = get_user_by_uid(db, uid)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    now = datetime.now()
+
+    task_query = db.query(Task.change_seq, *columns(Task, SYNC_TASK_FIELDS)).filter(sync_scope_filter(Task, user.user_id))
+    deletions = []
+    if since is not None:
+        try:
+            after_change_seq, after_tombstone_id, synced_at = decode_cursor(since, int, int, datetime)
+        except ValueError:
+            if not legacy_sync_cursor(since):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            synced_at = datetime.min
+        if cursor_expired(synced_at, now):
+            raise HTTPException(status_code=410, detail="Cursor expired, sync again without one")
+        task_query = task_query.filter(Task.change_seq > after_change_seq)
+        deletions = db.query(Tombstone.tombstone_id, *columns(Tombstone, DELETION_FIELDS)).filter(
+            sync_scope_filter(Tombstone, user.user_id),
+            Tombstone.tombstone_id > after_tombstone_id
+        ).order_by(Tombstone.tombstone_id).limit(limit).all()
+    else:
+        # Deletions before a full sync don't concern the client
+        after_change_seq = 0
+        after_tombstone_id = db.query(func.coalesce(func.max(Tombstone.tombstone_id), 0)).scalar()
+    rows = task_query.order_by(Task.change_seq).limit(limit).all()
+    tasks = [dict(zip(SYNC_TASK_FIELDS, row[1:])) for row in rows]
+
+    assignee_ids = {task["task_id"]: [] for task in tasks}
+    if tasks:
+        for task_id, user_id in db.query(TaskAssignee.task_id, TaskAssignee.user_id).filter(TaskAssignee.task_id.in_(assignee_ids)):
+            assignee_ids[task_id].append(user_id)
+        after_change_seq = rows[-1].change_seq
+    if deletions:
+        after_tombstone_id = deletions[-1].tombstone_id
+
+    tags = load_tags(db, list(assignee_ids))
+    for task in tasks:
+        task["assignee_ids"] = assignee_ids[task["task_id"]]
+        task["tags"] = tags[task["task_id"]]
+    return ORJSONResponse({
+        "tasks": tasks,
+        "deleted": [dict(zip(DELETION_FIELDS, deletion[1:])) for deletion in deletions],
+        "next_cursor": encode_cursor(after_change_seq, after_tombstone_id, now),
+        "has_more": len(tasks) == limit or len(deletions) == limit,
+    })
+
+# Cursors from before change_seq held (updated_at, task_id, tombstone_id, synced_at);
+# they are answered like expired ones, so those clients start over with a full sync
+def legacy_sync_cursor(cursor):
+    try:
+        decode_cursor(cursor, datetime, int, int, datetime)
+    except ValueError:
+        return False
+    return True
+
+# Prometheus-style per-route request, database and serialization histograms
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    gauges = [(f"task_app_user_cache_{name}", value) for name, value in user_cache.stats().items()]
+    gauges += [(f"task_app_tag_index_{name}", value) for name, value in tag_index.stats().items()]
+    gauges += [(f"task_app_events_{name}", value) for name, value in event_bus.stats().items()]
+    if REMINDERS_ENABLED:
+        gauges += [(f"task_app_reminders_{name}", value) for name, value in reminder_scheduler.stats().items()]
+    return route_metrics.render(gauges)
@@ -0,0 +1,129 @@
+# Hot/cold split of the tasks table.
+#
+# Tasks in ARCHIVE_STATUSES that haven't changed for ARCHIVE_AFTER_DAYS move to
+# tasks_archive, with their tag and assignee rows, so the live tables and their indexes
+# only hold the working set. Each batch of ARCHIVE_BATCH_SIZE tasks moves in its own
+# short transaction. Archived tasks keep their ids, which AUTOINCREMENT never hands out
+# again, leave search and the team counters, and are read back only by listings called
+# with include_archived=true.
+#
+# The app runs the archiver every ARCHIVE_INTERVAL_SECONDS when that is set; otherwise
+# run it from cron:
+#
+#   python archive.py run
+#   python archive.py cleanup    # remove tag and assignee rows left behind by deleted tasks
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, delete, insert, literal, select
+from starlette.concurrency import run_in_threadpool
+from models import ArchivedTask, ArchivedTaskAssignee, ArchivedTaskTag, Task, TaskAssignee, TaskTag
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_STATUSES = tuple(status.strip() for status in os.getenv("ARCHIVE_STATUSES", "Done").split(",") if status.strip())
+ARCHIVE_AFTER = timedelta(days=float(os.getenv("ARCHIVE_AFTER_DAYS", "30")))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# 0 leaves archiving to the CLI
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+tasks_table = Task.__table__
+# Live join tables and their archive counterparts, which have the same columns
+LINK_TABLES = (
+    (TaskTag.__table__, ArchivedTaskTag.__table__),
+    (TaskAssignee.__table__, ArchivedTaskAssignee.__table__),
+)
+
+# Delete the tag and assignee rows of these tasks, live or archived; call with the tasks' own delete
+def delete_task_links(db, task_ids, archived=False):
+    for live_link, archived_link in LINK_TABLES:
+        link = archived_link if archived else live_link
+        db.execute(delete(link).where(link.c.task_id.in_(task_ids)))
+
+# Move up to batch_size expired tasks to the archive in the caller's transaction.
+# Returns the (created_by, team_id) of each moved task.
+def archive_batch(db, now=None, batch_size=ARCHIVE_BATCH_SIZE):
+    now = now or datetime.now()
+    # Copying the candidates is the batch's first statement, so it takes the write lock
+    # before it picks them and concurrent archivers never pick the same tasks (with FOR
+    # UPDATE SKIP LOCKED where supported)
+    candidates = select(*tasks_table.c, literal(now, DateTime)).where(
+        tasks_table.c.status.in_(ARCHIVE_STATUSES),
+        tasks_table.c.updated_at < now - ARCHIVE_AFTER
+    ).limit(batch_size).with_for_update(skip_locked=True)
+    archived_table = ArchivedTask.__table__
+    rows = db.execute(insert(archived_table).from_select(
+        [*tasks_table.c.keys(), "archived_at"], candidates
+    ).returning(archived_table.c.task_id, archived_table.c.created_by, archived_table.c.team_id)).all()
+    if not rows:
+        return []
+    task_ids = [row.task_id for row in rows]
+    # The join rows are copied before the tasks are deleted: where foreign keys are
+    # enforced, deleting a task cascades to its tag and assignee rows
+    for link, archived_link in LINK_TABLES:
+        db.execute(insert(archived_link).from_select(
+            list(link.c.keys()), select(link).where(link.c.task_id.in_(task_ids))
+        ))
+    db.execute(delete(tasks_table).where(tasks_table.c.task_id.in_(task_ids)))
+    # Where foreign keys aren't enforced, nothing has removed the join rows yet
+    delete_task_links(db, task_ids)
+    return [(row.created_by, row.team_id) for row in rows]
+
+# Archive batches until none is left, committing each; on_archived(owners) runs after each commit
+def archive_expired(session_factory, now=None, batch_size=ARCHIVE_BATCH_SIZE, on_archived=None):
+    archived = 0
+    while True:
+        with session_factory.begin() as db:
+            owners = archive_batch(db, now, batch_size)
+        if owners and on_archived is not None:
+            on_archived(owners)
+        archived += len(owners)
+        if len(owners) < batch_size:
+            return archived
+
+# Background loop started by the app; each pass runs in the threadpool
+async def run_periodically(session_factory, interval=ARCHIVE_INTERVAL_SECONDS, on_archived=None):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            archived = await run_in_threadpool(archive_expired, session_factory, on_archived=on_archived)
+        except Exception:
+            logger.exception("Archiving failed")
+            continue
+        if archived:
+            logger.info("Archived %d tasks", archived)
+
+# Remove join rows whose task is in neither the live nor the archive table. Scans both
+# join tables, so it is a maintenance command rather than something the app runs.
+def cleanup_orphans(conn):
+    removed = 0
+    for link, archived_link in LINK_TABLES:
+        removed += conn.execute(delete(link).where(
+            link.c.task_id.notin_(select(Task.task_id))
+        )).rowcount
+        removed += conn.execute(delete(archived_link).where(
+            archived_link.c.task_id.notin_(select(ArchivedTask.task_id))
+        )).rowcount
+    return removed
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv not in (["run"], ["cleanup"]):
+        print("usage: python archive.py run|cleanup")
+        return 2
+    from database import SessionLocal, init_db, sync_engine
+
+    init_db()
+    if argv == ["run"]:
+        archived = archive_expired(SessionLocal)
+        print(f"Archived {archived} tasks in {', '.join(ARCHIVE_STATUSES)} unchanged for {ARCHIVE_AFTER.days} days")
+    else:
+        with sync_engine.begin() as conn:
+            removed = cleanup_orphans(conn)
+        print(f"Removed {removed} orphaned tag and assignee rows")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
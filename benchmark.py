@@ -0,0 +1,436 @@
+# Load-test and benchmark harness.
+#
+# Seeds one SQLite database per size, replays a request mix against the app either
+# in-process (ASGI transport) or over a local uvicorn server, and reports requests per
+# second, p50/p95/p99 latency and SQL statements per request for each endpoint.
+#
+#   python benchmark.py --sizes 1000,100000 --profile mixed --requests 2000 --out baseline.json
+#   python benchmark.py --sizes 1000 --replay mix.jsonl --compare baseline.json
+#   python benchmark.py --sizes 100k,1m --serialization
+#
+# A replay file holds one request per line: {"method": "GET", "path": "/tasks/{uid}",
+# "params": {...}, "json": {...}, "weight": 3}. {uid}, {user_id}, {team_id} and
+# {task_id} anywhere in the path or body are filled with ids from the seeded database.
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Synthetic request mixes: (weight, method, path, request kwargs)
+PROFILES = {
+    "read": [
+        (40, "GET", "/tasks/{uid}", {}),
+        (20, "GET", "/team-tasks/{team_id}", {}),
+        (20, "GET", "/teams/{uid}", {}),
+        (20, "POST", "/auth", {"json": {"uid": "{uid}"}}),
+    ],
+    "mixed": [
+        (30, "GET", "/tasks/{uid}", {}),
+        (15, "GET", "/team-tasks/{team_id}", {}),
+        (10, "GET", "/teams/{uid}", {}),
+        (15, "POST", "/auth", {"json": {"uid": "{uid}"}}),
+        (15, "POST", "/tasks", {"json": {"title": "bench", "status": "Todo", "uid": "{uid}", "tags": ["bench"]}}),
+        (10, "PUT", "/tasks/{task_id}", {"json": {"status": "In Progress"}}),
+        (5, "POST", "/tasks/assignees", {"json": {"task_id": "{task_id}", "assignees": ["{user_id}"]}}),
+    ],
+    "write": [
+        (40, "POST", "/tasks", {"json": {"title": "bench", "status": "Todo", "uid": "{uid}", "tags": ["bench"]}}),
+        (30, "PUT", "/tasks/{task_id}", {"json": {"status": "Done", "tags": ["bench", "done"]}}),
+        (20, "POST", "/tasks/assignees", {"json": {"task_id": "{task_id}", "assignees": ["{user_id}"]}}),
+        (10, "GET", "/tasks/{uid}", {}),
+    ],
+}
+
+SERVER_TIMING_STATEMENTS = re.compile(r'db;[^,]*desc="(\d+) statements"')
+
+def parse_sizes(value):
+    multipliers = {"k": 1000, "m": 1000000}
+    sizes = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        sizes.append(int(float(part[:-1]) * multipliers[part[-1]]) if part[-1] in multipliers else int(part))
+    return sizes
+
+# Seed a database with the given number of tasks using the data generator
+def seed_database(path, task_count):
+    import generate_data
+
+    users = max(task_count // 20, 10)
+    generate_data.generate(generate_data.parse_args([
+        "--database-url", f"sqlite:///{path}",
+        "--users", str(users),
+        "--tasks-per-user", str(max(task_count // users, 1)),
+        "--teams", str(max(users // 10, 2)),
+        "--tags", str(max(task_count // 100, 10)),
+        "--seed", str(task_count),
+    ]))
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+
+def load_mix(args):
+    if args.replay is None:
+        return PROFILES[args.profile]
+    mix = []
+    skipped = 0
+    with open(args.replay) as replay:
+        for line in replay:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "method" not in entry or "path" not in entry:
+                skipped += 1
+                continue
+            kwargs = {key: entry[key] for key in ("params", "json", "headers") if key in entry}
+            mix.append((entry.get("weight", 1), entry["method"].upper(), entry["path"], kwargs))
+    if skipped:
+        print(f"Skipped {skipped} line(s) of {args.replay} without method/path", file=sys.stderr)
+    if not mix:
+        sys.exit(f"{args.replay} contains no replayable requests")
+    return mix
+
+# CPU time per task to render the largest team's listing, through the serialization layer
+# and through the ORM + Pydantic path it replaced (from_orm per task, nested from_orm per
+# team, assignee and tag, then TypeAdapter encoding). Runs in the child process.
+def measure_serialization(args):
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import selectinload
+    import app as app_module
+    from database import SessionLocal
+    from models import Task
+    from serialization import TASK_FIELDS, columns, dumps, team_task_dicts
+
+    TeamTaskResponse, TeamResponse = app_module.TeamTaskResponse, app_module.TeamResponse
+    UserResponse, TagResponse = app_module.UserResponse, app_module.TagResponse
+    adapter = TypeAdapter(List[TeamTaskResponse])
+
+    with SessionLocal() as db:
+        team_id, task_count = db.execute(
+            select(Task.team_id, func.count()).filter(Task.team_id != None)
+            .group_by(Task.team_id).order_by(func.count().desc()).limit(1)
+        ).one()
+
+        def pydantic_listing():
+            tasks = db.query(Task).options(
+                selectinload(Task.assignees),
+                selectinload(Task.tags)
+            ).filter(Task.team_id == team_id).all()
+            responses = []
+            for task in tasks:
+                response = TeamTaskResponse.from_orm(task)
+                response.team = TeamResponse.from_orm(task.team) if task.team else None
+                response.assignees = [UserResponse.from_orm(assignee) for assignee in task.assignees]
+                response.tags = [TagResponse.from_orm(tag) for tag in task.tags]
+                responses.append(response)
+            return adapter.dump_json(responses)
+
+        def orjson_listing():
+            team = app_module.team_dict(db, team_id)
+            rows = db.query(*columns(Task, TASK_FIELDS)).filter(Task.team_id == team_id).all()
+            return dumps(team_task_dicts(db, rows, team))
+
+        # Best of --repeat runs, each on an empty identity map
+        def cpu_per_task(render):
+            best = None
+            for _ in range(args.repeat):
+                db.expunge_all()
+                started = time.process_time()
+                render()
+                elapsed = time.process_time() - started
+                best = elapsed if best is None else min(best, elapsed)
+            return best / task_count * 1e6
+
+        pydantic_us = cpu_per_task(pydantic_listing)
+        orjson_us = cpu_per_task(orjson_listing)
+    return {
+        "team_tasks": task_count,
+        "pydantic_us_per_task": round(pydantic_us, 2),
+        "orjson_us_per_task": round(orjson_us, 2),
+        "saved_us_per_task": round(pydantic_us - orjson_us, 2),
+        "speedup": round(pydantic_us / orjson_us, 2),
+    }
+
+def run_serialization(args, seed_path):
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{seed_path}"}
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--serialization", "--repeat", str(args.repeat)]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+# Replace {uid}/{user_id}/{team_id}/{task_id} placeholders with seeded ids
+def fill(value, ids):
+    if isinstance(value, str):
+        if value in ("{user_id}", "{team_id}", "{task_id}"):
+            return ids[value[1:-1]]
+        return value.format(**ids) if "{" in value else value
+    if isinstance(value, list):
+        return [fill(item, ids) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    return value
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for key, latency, statements, status in samples:
+        endpoint = endpoints.setdefault(key, {"latencies": [], "statements": [], "errors": 0})
+        endpoint["latencies"].append(latency)
+        if statements is not None:
+            endpoint["statements"].append(statements)
+        if status >= 400:
+            endpoint["errors"] += 1
+    report = {"requests": len(samples), "rps": round(len(samples) / elapsed, 1), "endpoints": {}}
+    for key, endpoint in sorted(endpoints.items()):
+        latencies = sorted(endpoint["latencies"])
+        statements = endpoint["statements"]
+        report["endpoints"][key] = {
+            "requests": len(latencies),
+            "errors": endpoint["errors"],
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "sql_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+        }
+    return report
+
+# Runs inside a child process whose DATABASE_URL points at the seeded copy
+async def run_load(args, base_url=None):
+    import httpx
+    from sqlalchemy import event, text
+
+    statement_count = contextvars.ContextVar("statement_count", default=None)
+    transport = None
+    lifespan = contextlib.nullcontext()
+    if base_url is None:
+        import app as app_module
+        import database
+
+        # The ASGI transport runs the app in the caller's task, so the counter set by
+        # each worker below follows its request into the endpoint and threadpool
+        def count_statement(*_):
+            counter = statement_count.get()
+            if counter is not None:
+                counter[0] += 1
+
+        for engine in {database.engine, database.read_engine}:
+            event.listen(getattr(engine, "sync_engine", engine), "before_cursor_execute", count_statement)
+        transport = httpx.ASGITransport(app=app_module.app)
+        lifespan = app_module.app.router.lifespan_context(app_module.app)
+        base_url = "http://bench"
+
+    from sqlalchemy import create_engine
+
+    engine = create_engine(f"sqlite:///{args.db}")
+    with engine.connect() as conn:
+        # uids are base64 and may contain "/", which cannot be routed as a path segment
+        uids = conn.execute(text("SELECT uid FROM users WHERE uid NOT LIKE '%/%' ORDER BY random() LIMIT 1000")).scalars().all()
+        max_user = conn.execute(text("SELECT max(user_id) FROM users")).scalar()
+        max_team = conn.execute(text("SELECT max(team_id) FROM teams")).scalar()
+        max_task = conn.execute(text("SELECT max(task_id) FROM tasks")).scalar()
+    engine.dispose()
+
+    mix = json.loads(args.mix)
+    weights = [entry[0] for entry in mix]
+    rng = random.Random(args.seed)
+    plan = []
+    for _ in range(args.requests):
+        _, method, path, kwargs = rng.choices(mix, weights)[0]
+        ids = {
+            "uid": rng.choice(uids),
+            "user_id": rng.randint(1, max_user),
+            "team_id": rng.randint(1, max_team),
+            "task_id": rng.randint(1, max_task),
+        }
+        plan.append((f"{method} {path}", method, fill(path, ids), fill(kwargs, ids)))
+
+    samples = []
+    queue = iter(plan)
+
+    async def worker(client):
+        for key, method, url, kwargs in queue:
+            counter = [0]
+            statement_count.set(counter)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latency = time.perf_counter() - started
+            statements = counter[0] if transport else server_statements(response)
+            samples.append((key, latency, statements, response.status_code))
+
+    async def timed_run():
+        async with lifespan, httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+            return time.perf_counter() - started
+
+    elapsed = await timed_run()
+    return summarize(samples, elapsed)
+
+# Statement count reported by the app's Server-Timing header, for out-of-process runs
+def server_statements(response):
+    match = SERVER_TIMING_STATEMENTS.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else None
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# Benchmark one seeded size in a fresh process, optionally behind a uvicorn server
+def run_size(args, seed_path, mix):
+    work_dir = tempfile.mkdtemp(prefix="task_bench_")
+    db_path = os.path.join(work_dir, "bench.db")
+    # Writes in the mix must not leak into the cached seed
+    shutil.copyfile(seed_path, db_path)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    if args.async_mode:
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    command = [
+        sys.executable, os.path.abspath(__file__), "--worker",
+        "--db", db_path, "--mix", json.dumps(mix), "--requests", str(args.requests),
+        "--concurrency", str(args.concurrency), "--seed", str(args.seed),
+    ]
+    server = None
+    try:
+        if args.mode == "uvicorn":
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+                env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+            wait_for_port(port)
+            command += ["--base-url", f"http://127.0.0.1:{port}"]
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        return json.loads(output.strip().splitlines()[-1])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"uvicorn did not start on port {port}")
+
+# Print regressions against a saved baseline; returns True when any endpoint got slower
+def compare(results, baseline, threshold):
+    regressed = False
+    for size, report in results["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        for key, current in report.get("endpoints", {}).items():
+            before = previous.get("endpoints", {}).get(key)
+            if before is None:
+                continue
+            for metric in ("p95_ms", "sql_per_request"):
+                if before.get(metric) and current.get(metric) is not None:
+                    change = (current[metric] - before[metric]) / before[metric]
+                    if change > threshold:
+                        regressed = True
+                        print(f"REGRESSION {size} {key} {metric}: {before[metric]} -> {current[metric]} (+{change:.0%})")
+    return regressed
+
+def print_report(size, report):
+    print(f"\n{size} tasks: {report['requests']} requests, {report['rps']} req/s")
+    print(f"  {'endpoint':<45} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'sql/req':>8} {'errors':>7}")
+    for key, endpoint in report["endpoints"].items():
+        sql = "-" if endpoint["sql_per_request"] is None else endpoint["sql_per_request"]
+        print(f"  {key:<45} {endpoint['rps']:>8} {endpoint['p50_ms']:>9} {endpoint['p95_ms']:>9} "
+              f"{endpoint['p99_ms']:>9} {sql:>8} {endpoint['errors']:>7}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the task API against seeded databases")
+    parser.add_argument("--sizes", default="1k", help="comma separated task counts, e.g. 1k,100k,1m")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed", help="synthetic request mix")
+    parser.add_argument("--replay", help="JSON lines file of requests to replay instead of a profile")
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--async", dest="async_mode", action="store_true", help="run the app with sqlite+aiosqlite")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "task_bench_data"),
+                        help="where seeded databases are cached between runs")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown before failing")
+    parser.add_argument("--serialization", action="store_true",
+                        help="measure CPU per task of the largest team listing instead of replaying requests")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per serialization measurement")
+    # Internal: executed in the child process that imports the app
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--mix", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = measure_serialization(args) if args.serialization else asyncio.run(run_load(args, args.base_url))
+        print(json.dumps(result))
+        return 0
+
+    mix = load_mix(args)
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "mode": args.mode,
+        "async": args.async_mode,
+        "mix": args.replay or args.profile,
+        "sizes": {},
+    }
+    for size in parse_sizes(args.sizes):
+        seed_path = os.path.join(args.data_dir, f"seed_{size}.db")
+        if not os.path.exists(seed_path):
+            print(f"Seeding {size} tasks into {seed_path}", file=sys.stderr)
+            seed_database(seed_path + ".tmp", size)
+            os.replace(seed_path + ".tmp", seed_path)
+        if args.serialization:
+            report = run_serialization(args, seed_path)
+            results["sizes"][str(size)] = report
+            print(f"{size} tasks, largest team listing of {report['team_tasks']} tasks: "
+                  f"{report['pydantic_us_per_task']} us/task before, {report['orjson_us_per_task']} us/task now "
+                  f"({report['speedup']}x)")
+            continue
+        report = run_size(args, seed_path, mix)
+        results["sizes"][str(size)] = report
+        print_report(size, report)
+
+    if args.out:
+        with open(args.out, "w") as out:
+            json.dump(results, out, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            if compare(results, json.load(baseline), args.threshold):
+                return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,15 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import MetaData, create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+import functools
 import os
 from dotenv import load_dotenv
-from models import Base 
+from sqlalchemy.schema import CreateTable
+from models import Base, Task
+from search import CONTENT_VIEW, drop_search_triggers, init_search
+from sync import init_change_seq
+from team_stats import init_counter_triggers, rebuild_team_counters
 
 # Load environment variables from .env file
 load_dotenv()
@@ -10,28 +17,180 @@ load_dotenv()
 # Get database URL from environment variable or use a default SQLite database
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
 
+# An async driver in the URL (e.g. sqlite+aiosqlite) switches the app to async mode
+database_url = make_url(SQLALCHEMY_DATABASE_URL)
+ASYNC_MODE = database_url.get_dialect().is_async
+
+# Scripts, schema setup and other tooling always use a blocking driver for the same database
+SYNC_DATABASE_URL = database_url.set(drivername=database_url.get_backend_name()) if ASYNC_MODE else database_url
+
+# "production" tunes SQLite connections and serves GET requests from a read-only pool
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+SQLITE_PRODUCTION = DB_PROFILE == "production" and database_url.get_backend_name() == "sqlite"
+
+# Applied to every connection in the production profile; journal_mode is persistent
+# in the database file, so read-only connections skip it
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "temp_store": "MEMORY",
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+}
+
+def engine_args(url, read_only=False):
+    if url.get_backend_name() == "sqlite":
+        args = {"connect_args": {"check_same_thread": False}}
+        if read_only:
+            args["pool_size"] = int(os.getenv("READ_POOL_SIZE", "8"))
+            args["max_overflow"] = int(os.getenv("READ_POOL_OVERFLOW", "8"))
+        return args
+    return {}
+
+def set_sqlite_pragmas(engine, read_only=False):
+    @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            if read_only and pragma == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+# Same file opened through a mode=ro URI, so these connections can never take the write lock
+def read_only_url(url):
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
 # Create SQLAlchemy engine
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+sync_engine = create_engine(SYNC_DATABASE_URL, **engine_args(SYNC_DATABASE_URL))
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    engine = create_async_engine(database_url, **engine_args(database_url))
+    AsyncSessionLocal = async_sessionmaker(engine, autoflush=False)
+else:
+    engine = sync_engine
+    AsyncSessionLocal = None
+
+read_engine = engine
+if SQLITE_PRODUCTION:
+    set_sqlite_pragmas(sync_engine)
+    if engine is not sync_engine:
+        set_sqlite_pragmas(engine)
+    # In-memory databases are private to a connection and get no separate read pool
+    if database_url.database not in (None, "", ":memory:"):
+        if ASYNC_MODE:
+            read_engine = create_async_engine(read_only_url(database_url), **engine_args(database_url, read_only=True))
+        else:
+            read_engine = create_engine(read_only_url(database_url), **engine_args(database_url, read_only=True))
+        set_sqlite_pragmas(read_engine, read_only=True)
+
+if ASYNC_MODE:
+    ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False)
+
+    # Dependency injection; GET requests get a session on the read-only pool
+    async def get_db(request: Request):
+        session_factory = ReadSessionLocal if request.method == "GET" else AsyncSessionLocal
+        async with session_factory() as db:
+            yield db
+else:
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+    # Dependency injection; GET requests get a session on the read-only pool
+    def get_db(request: Request):
+        session_factory = ReadSessionLocal if request.method == "GET" else SessionLocal
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+# Route decorator: in async mode the endpoint becomes a coroutine that runs its
+# body against the AsyncSession's sync facade, so no threadpool worker is held
+# while waiting on the database. In sync mode the endpoint is returned as is.
+def db_endpoint(endpoint):
+    if not ASYNC_MODE:
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        async_db = kwargs["db"]
+
+        def call(db):
+            return endpoint(*args, **{**kwargs, "db": db})
+
+        return await async_db.run_sync(call)
+
+    return wrapper
+
+# Drop every pooled connection without closing it, for a process that must not share
+# them: a worker forked from a parent that already connected, or a launcher about to
+# hand off to its workers. The pools reconnect on next use.
+def dispose_engines():
+    for pooled in {sync_engine, engine, read_engine}:
+        getattr(pooled, "sync_engine", pooled).dispose(close=False)
+
+# Pre-fork servers (e.g. gunicorn --preload) import the app once and fork workers from it
+os.register_at_fork(after_in_child=dispose_engines)
+
+# Add the change_seq column to task tables created before it; init_change_seq numbers the rows
+def add_change_seq_columns(conn):
+    for table in ("tasks", "tasks_archive"):
+        if "change_seq" not in {column["name"] for column in inspect(conn).get_columns(table)}:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER")
 
-# Dependency injection
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Rebuild a tasks table created before task ids used AUTOINCREMENT. SQLite can't add it in
+# place, so the rows are copied into a new table that replaces the old one; its sequence
+# starts above every id handed out so far, including archived and deleted tasks. The
+# indexes, triggers and search view go with the old table and are recreated by init_db.
+def migrate_task_ids(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    schema = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'")).scalar()
+    if schema is None or "AUTOINCREMENT" in schema.upper():
+        return
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        if table is not Task.__table__:
+            table.to_metadata(metadata)
+    rebuilt = Task.__table__.to_metadata(metadata, name="tasks_rebuild")
+    columns = ", ".join(column.name for column in rebuilt.columns)
+    drop_search_triggers(conn)
+    conn.exec_driver_sql(f"DROP VIEW IF EXISTS {CONTENT_VIEW}")
+    conn.execute(CreateTable(rebuilt))
+    conn.exec_driver_sql(f"INSERT INTO tasks_rebuild ({columns}) SELECT {columns} FROM tasks")
+    conn.exec_driver_sql("DROP TABLE tasks")
+    conn.exec_driver_sql("ALTER TABLE tasks_rebuild RENAME TO tasks")
+    last_id = conn.exec_driver_sql(
+        "SELECT max(coalesce((SELECT max(task_id) FROM tasks), 0), coalesce((SELECT max(task_id) FROM tasks_archive), 0),"
+        " coalesce((SELECT max(task_id) FROM tombstones), 0))"
+    ).scalar()
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'tasks'")
+    conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', ?)", (last_id,))
 
 # Function to initialize the database
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    counters_exist = inspect(sync_engine).has_table("team_counters")
+    Base.metadata.create_all(bind=sync_engine)
+    with sync_engine.begin() as conn:
+        add_change_seq_columns(conn)
+        migrate_task_ids(conn)
+        init_change_seq(conn)
+        init_counter_triggers(conn)
+    # create_all skips the indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=sync_engine, checkfirst=True)
+    init_search(sync_engine)
+    # A new counters table starts from the tasks and members already in the database
+    if not counters_exist:
+        with sync_engine.begin() as conn:
+            rebuild_team_counters(conn)
 
 # Function to get a database session
 def get_session():
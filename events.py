@@ -0,0 +1,181 @@
+# In-process pub/sub for live task changes, one topic per team.
+#
+# Write endpoints publish compact JSON events after commit; each SSE or WebSocket
+# subscriber has a bounded backlog. A subscriber that falls more than EVENTS_QUEUE_SIZE
+# events behind has its backlog replaced by a single resync event, telling the client
+# to catch up through /sync, so one slow consumer never holds memory or the publisher.
+#
+# Events are encoded once per publish and shared by every subscriber. With
+# EVENTS_BROKER_DIR set, workers on the same host also forward events to each other
+# over Unix datagram sockets in that directory.
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+from collections import deque
+import orjson
+
+logger = logging.getLogger("task_app.events")
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_BROKER_DIR = os.getenv("EVENTS_BROKER_DIR")
+
+RESYNC = json.dumps({"type": "resync"})
+
+class Subscriber:
+    __slots__ = ("topic", "pending", "ready", "maxsize", "bus")
+
+    def __init__(self, bus, topic, maxsize):
+        self.bus = bus
+        self.topic = topic
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        self.maxsize = maxsize
+
+    def push(self, message):
+        if len(self.pending) >= self.maxsize:
+            if self.pending[0] is not RESYNC:
+                self.bus.resyncs += 1
+            self.pending.clear()
+            self.pending.append(RESYNC)
+        else:
+            self.pending.append(message)
+        self.ready.set()
+
+    # Next message, or None when nothing arrived within timeout seconds
+    async def get(self, timeout=None):
+        while not self.pending:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.pending.popleft()
+
+class EventBus:
+    def __init__(self, queue_size=100, broker_dir=None):
+        self.queue_size = queue_size
+        self.broker_dir = broker_dir
+        self.broker = None
+        self.loop = None
+        self.topics = {}
+        self.published = 0
+        self.resyncs = 0
+
+    # Bind to the running loop; called on startup
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        if self.broker_dir and self.broker is None:
+            self.broker = DatagramBroker(self.broker_dir, self.deliver)
+            self.broker.start(self.loop)
+
+    def stop(self):
+        if self.broker is not None:
+            self.broker.close()
+            self.broker = None
+        self.loop = None
+
+    def subscribe(self, topic):
+        subscriber = Subscriber(self, topic, self.queue_size)
+        self.topics.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscribers = self.topics.get(subscriber.topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.topics[subscriber.topic]
+
+    # Safe to call from any thread: sync endpoints run in the threadpool
+    def publish(self, topic, event):
+        # orjson, as REST responses use, so datetimes come out in the same ISO format
+        message = orjson.dumps(event).decode()
+        self.published += 1
+        loop = self.loop
+        if loop is not None:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self.deliver(topic, message)
+            else:
+                try:
+                    loop.call_soon_threadsafe(self.deliver, topic, message)
+                except RuntimeError:
+                    pass  # loop already closed during shutdown
+        if self.broker is not None:
+            self.broker.send(topic, message)
+
+    # Runs on the loop thread
+    def deliver(self, topic, message):
+        for subscriber in self.topics.get(topic, ()):
+            subscriber.push(message)
+
+    def stats(self):
+        return {
+            "subscribers": sum(len(subscribers) for subscribers in self.topics.values()),
+            "published_total": self.published,
+            "resyncs_total": self.resyncs,
+        }
+
+# Stand-in for an external broker between the workers of one host: each worker binds
+# <broker_dir>/<pid>.sock and sends every event to the other sockets in the directory.
+# Sockets of workers that are gone are removed; if a peer's receive buffer is full the
+# datagram is dropped, which that peer's clients notice only on their next /sync.
+class DatagramBroker:
+    def __init__(self, directory, on_message):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.on_message = on_message
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        self.send_lock = threading.Lock()
+        self.loop = None
+
+    def start(self, loop):
+        self.loop = loop
+        loop.add_reader(self.sock.fileno(), self.receive)
+
+    def receive(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            topic, _, message = data.decode().partition("\n")
+            self.on_message(int(topic), message)
+
+    def send(self, topic, message):
+        data = f"{topic}\n{message}".encode()
+        with self.send_lock:
+            for entry in os.scandir(self.directory):
+                if entry.path == self.path or not entry.name.endswith(".sock"):
+                    continue
+                try:
+                    self.sock.sendto(data, entry.path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+                except BlockingIOError:
+                    logger.warning("Dropped event for %s: receive buffer full", entry.name)
+
+    def close(self):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+event_bus = EventBus(queue_size=EVENTS_QUEUE_SIZE, broker_dir=EVENTS_BROKER_DIR)
@@ -0,0 +1,186 @@
+# Query-plan regression check.
+#
+# Seeds a throwaway SQLite database, calls every endpoint in app.py once, captures
+# each statement the endpoints issue and runs EXPLAIN QUERY PLAN on it, with the first
+# parameter set of an executemany. Exits non-zero if any plan SCANs a table, through an
+# index or not, that isn't allow-listed, or if a route has no sample request below.
+#
+#   python explain_check.py [--tasks 5000] [--keep path.db]
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+parser = argparse.ArgumentParser(description="Fail when an endpoint query plan scans a table")
+parser.add_argument("--tasks", type=int, default=5000, help="number of seeded tasks")
+parser.add_argument("--keep", help="write the seeded database here instead of a temp file")
+args = parser.parse_args()
+
+db_path = args.keep or os.path.join(tempfile.mkdtemp(), "explain.db")
+if os.path.exists(db_path):
+    os.remove(db_path)
+# Must be set before the app and database modules are imported
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert, text
+import app as app_module
+import database
+from pagination import encode_cursor
+from team_stats import rebuild_team_counters
+from models import *
+
+# Plans that are acceptable despite a scan, as (table, statement prefix) pairs
+ALLOWED_SCANS = set()
+
+# Only SEARCH steps seek; a SCAN walks the whole table or index, even USING [COVERING] INDEX.
+# Virtual tables plan their own lookups (FTS5 reports a MATCH as a SCAN).
+TABLE_SCAN = re.compile(r"^SCAN (\S+)(?!.*VIRTUAL TABLE)")
+# Subqueries and CTEs the plan evaluates first; scanning their (already limited) rows is not a table scan
+SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\S+)")
+
+# Seed a database large enough for the planner to prefer indexes
+def seed(conn, task_count):
+    rng = random.Random(0)
+    now = datetime.now()
+    user_count = max(task_count // 25, 10)
+    team_count = max(user_count // 10, 2)
+    users = [User(email=f"user{i}@example.com", username=f"user{i}") for i in range(user_count)]
+    conn.execute(insert(User), [
+        {"user_id": i + 1, "username": user.username, "email": user.email, "uid": user.uid, "created_at": now}
+        for i, user in enumerate(users)
+    ])
+    conn.execute(insert(Team), [{"team_id": i + 1, "team_name": f"team{i}", "created_at": now} for i in range(team_count)])
+    conn.execute(insert(TeamMember), [
+        {"team_id": rng.randint(1, team_count), "user_id": user_id} for user_id in range(1, user_count + 1)
+    ])
+    conn.execute(insert(Task), [
+        {
+            "task_id": i + 1,
+            "title": f"task {i}",
+            "description": "seeded",
+            "status": rng.choice(("Todo", "In Progress", "Done")),
+            "due_date": date.today() + timedelta(days=rng.randint(-30, 30)),
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+            "created_by": rng.randint(1, user_count),
+            "team_id": rng.choice((None, rng.randint(1, team_count))),
+        }
+        for i in range(task_count)
+    ])
+    tag_count = max(task_count // 50, 5)
+    conn.execute(insert(Tag), [{"tag_id": i + 1, "name": f"tag{i}", "user_id": rng.randint(1, user_count)} for i in range(tag_count)])
+    conn.execute(insert(TaskTag), [
+        {"task_id": task_id, "tag_id": tag_id}
+        for task_id in range(1, task_count + 1)
+        for tag_id in rng.sample(range(1, tag_count + 1), 2)
+    ])
+    conn.execute(insert(TaskAssignee), [
+        {"task_id": task_id, "user_id": rng.randint(1, user_count)} for task_id in range(1, task_count + 1, 3)
+    ])
+    rebuild_team_counters(conn)
+    conn.execute(text("ANALYZE"))
+    return users[0].uid
+
+# One sample call per route, as (method, path) -> (url, request kwargs).
+# Writes run after reads, deletes last, so every call sees seeded rows.
+def sample_requests(uid):
+    return {
+        ("POST", "/auth"): ("/auth", {"json": {"uid": uid}}),
+        ("GET", "/tasks/search"): ("/tasks/search", {"params": {"q": "task 1", "uid": uid, "highlight": True}}),
+        # include_archived runs the live-table queries and their archive counterparts
+        ("GET", "/tasks/{uid}"): (f"/tasks/{uid}", {"params": {"status": "Todo", "limit": 20, "include_archived": True}}),
+        ("GET", "/tasks/{uid}/upcoming"): (f"/tasks/{uid}/upcoming", {"params": {"days": 14}}),
+        ("GET", "/team-tasks/{team_id}/overdue"): ("/team-tasks/1/overdue", {}),
+        ("GET", "/team-tasks/{team_id}"): ("/team-tasks/1", {"params": {"include_archived": True}}),
+        ("GET", "/tags/suggest"): ("/tags/suggest", {"params": {"prefix": "tag1", "uid": uid}}),
+        ("GET", "/export/tasks"): ("/export/tasks", {"params": {"team_id": 1, "format": "csv", "include_archived": True}}),
+        ("GET", "/teams/{uid}"): (f"/teams/{uid}", {}),
+        ("GET", "/teams/{team_id}/members"): ("/teams/1/members", {}),
+        ("GET", "/teams/{team_id}/stats"): ("/teams/1/stats", {}),
+        ("GET", "/teams/stats"): ("/teams/stats", {"params": {"team_id": [1, 2]}}),
+        # An unknown team, so the endpoint answers 404 instead of holding the stream open;
+        # the team lookup is the only statement it issues either way
+        ("GET", "/teams/{team_id}/events"): ("/teams/0/events", {}),
+        ("GET", "/metrics"): ("/metrics", {}),
+        ("GET", "/sync"): ("/sync", {"params": {"uid": uid, "since": encode_cursor(0, 0, datetime.now())}}),
+        ("POST", "/user"): ("/user", {"json": {"username": "explain", "email": "explain@example.com"}}),
+        ("POST", "/tags"): ("/tags", {"json": {"name": "explain", "user_id": 1, "team_id": 1}}),
+        ("POST", "/tasks"): ("/tasks", {"json": {"title": "t", "status": "Todo", "uid": uid, "tags": ["tag1", "new"]}}),
+        ("POST", "/tasks/bulk"): ("/tasks/bulk", {"json": [{"title": "t", "status": "Todo", "uid": uid, "tags": ["tag2", "newer"]}]}),
+        ("PUT", "/tasks/{task_id}"): ("/tasks/2", {"json": {"status": "Done", "tags": ["tag3"], "assignee": [1, 2]}}),
+        ("PATCH", "/tasks/bulk"): ("/tasks/bulk", {"json": {"filter": {"team_id": 1, "status": "Todo"}, "status": "In Progress", "tags": ["tag4", "bulk"]}}),
+        ("POST", "/tasks/assignees"): ("/tasks/assignees", {"json": {"task_id": 3, "assignees": [4]}}),
+        ("POST", "/tasks/assignees/bulk"): ("/tasks/assignees/bulk", {"json": {"task_ids": [4, 7, 10], "assign": [5, 6], "unassign": [4]}}),
+        ("DELETE", "/tasks/{task_id}/assignees/{user_id}"): ("/tasks/3/assignees/4", {}),
+        ("DELETE", "/tasks/{task_id}"): ("/tasks/5", {}),
+    }
+
+METHOD_ORDER = {"GET": 0, "POST": 1, "PUT": 2, "PATCH": 2, "DELETE": 3}
+
+# Sample requests that are meant to fail, with the status they answer
+EXPECTED_ERRORS = {("GET", "/teams/{team_id}/events"): 404}
+
+def main():
+    database.init_db()
+    with database.sync_engine.begin() as conn:
+        uid = seed(conn, args.tasks)
+
+    captured = {}
+    current_route = [None]
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Only the sample requests' statements; app startup runs schema checks too
+        if current_route[0] is None:
+            return
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            # One parameter set plans the statement as well as any other
+            captured.setdefault((statement, current_route[0]), parameters[0] if executemany else parameters)
+
+    engines = {getattr(engine, "sync_engine", engine) for engine in (database.engine, database.read_engine)}
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", capture)
+
+    samples = sample_requests(uid)
+    routes = sorted(
+        ((method, route.path) for route in app_module.app.routes if isinstance(route, APIRoute) for method in route.methods),
+        key=lambda item: METHOD_ORDER.get(item[0], 1)
+    )
+    failures = []
+    with TestClient(app_module.app) as client:
+        for method, path in routes:
+            if (method, path) not in samples:
+                failures.append(f"{method} {path}: no sample request in explain_check.py")
+                continue
+            url, kwargs = samples[(method, path)]
+            current_route[0] = f"{method} {path}"
+            response = client.request(method, url, **kwargs)
+            if response.status_code >= 400 and response.status_code != EXPECTED_ERRORS.get((method, path)):
+                failures.append(f"{method} {path}: sample request failed with {response.status_code}: {response.text}")
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    with database.sync_engine.connect() as conn:
+        for (statement, route), parameters in captured.items():
+            plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            subqueries = {match.group(1) for match in (SUBQUERY.match(row[3]) for row in plan) if match}
+            for row in plan:
+                match = TABLE_SCAN.match(row[3])
+                if match is None or match.group(1) in subqueries or (match.group(1), statement.split("\n", 1)[0]) in ALLOWED_SCANS:
+                    continue
+                plan_text = "\n    ".join(row[3] for row in plan)
+                failures.append(f"{route}: scan of {match.group(1)}\n  {statement}\n  plan:\n    {plan_text}")
+                break
+
+    print(f"Checked {len(captured)} statements from {len(routes)} routes")
+    for failure in failures:
+        print("FAIL " + failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+# Streaming task exports for GET /export/tasks.
+#
+# Tasks are read in task_id order with yield_per, so the database hands them over
+# EXPORT_BATCH_SIZE rows at a time; each batch gets its tag names and assignee ids with
+# one IN query per table and is encoded into one chunk of the response body: CSV lines,
+# JSON lines or a Parquet row group. Memory stays bounded by the batch size however many
+# tasks are exported. Parquet needs pyarrow, which is optional. Encoding a chunk counts
+# as the request's serialization time.
+import csv
+import io
+from sqlalchemy import select
+from instrumentation import timed_serialization
+from serialization import SYNC_TASK_FIELDS, columns, dumps_lines, load_assignees, load_tags
+
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FIELDS = SYNC_TASK_FIELDS + ("tags", "assignees")
+
+def supports_parquet():
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return False
+    return True
+
+def export_query(model, where):
+    return select(*columns(model, SYNC_TASK_FIELDS)).filter(where).order_by(model.task_id).execution_options(
+        yield_per=EXPORT_BATCH_SIZE
+    )
+
+# Export rows of one batch of tasks: the task's fields, tag names and assignee user ids
+def export_rows(db, rows, archived=False):
+    tasks = [dict(zip(SYNC_TASK_FIELDS, row)) for row in rows]
+    task_ids = [task["task_id"] for task in tasks]
+    tags = load_tags(db, task_ids, archived)
+    assignees = load_assignees(db, task_ids, archived)
+    for task in tasks:
+        task["tags"] = [tag["name"] for tag in tags[task["task_id"]]]
+        task["assignees"] = [user["user_id"] for user in assignees[task["task_id"]]]
+    return tasks
+
+# Writers turn batches of export rows into body chunks; close() returns the last chunk
+class CsvWriter:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self):
+        self.header = True
+
+    @timed_serialization
+    def write(self, tasks):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self.header:
+            writer.writerow(EXPORT_FIELDS)
+            self.header = False
+        for task in tasks:
+            writer.writerow([
+                ";".join(task["tags"]) if field == "tags"
+                else ";".join(map(str, task["assignees"])) if field == "assignees"
+                else task[field]
+                for field in EXPORT_FIELDS
+            ])
+        return buffer.getvalue().encode()
+
+    def close(self):
+        # An empty export still gets its header
+        return self.write([]) if self.header else b""
+
+class JsonLinesWriter:
+    media_type = "application/x-ndjson"
+    extension = "jsonl"
+
+    def write(self, tasks):
+        return dumps_lines(tasks)
+
+    def close(self):
+        return b""
+
+# File-like sink that hands back what pyarrow wrote since the last drain
+class ChunkSink(io.RawIOBase):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+# One row group per batch; the footer with the schema and row group offsets comes last
+class ParquetWriter:
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("task_id", pa.int64()),
+            ("title", pa.string()),
+            ("description", pa.string()),
+            ("status", pa.string()),
+            ("due_date", pa.date32()),
+            ("created_at", pa.timestamp("us")),
+            ("updated_at", pa.timestamp("us")),
+            ("created_by", pa.int64()),
+            ("team_id", pa.int64()),
+            ("tags", pa.list_(pa.string())),
+            ("assignees", pa.list_(pa.int64())),
+        ])
+        self.sink = ChunkSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema)
+
+    @timed_serialization
+    def write(self, tasks):
+        if tasks:
+            self.writer.write_table(self.pa.Table.from_pylist(tasks, schema=self.schema))
+        return self.sink.drain()
+
+    @timed_serialization
+    def close(self):
+        self.writer.close()
+        return self.sink.drain()
+
+EXPORT_WRITERS = {"csv": CsvWriter, "jsonl": JsonLinesWriter, "parquet": ParquetWriter}
+
+# Body chunks of an export; queries is a list of (statement, archived) run one after the other
+def export_chunks(db, writer, queries):
+    for statement, archived in queries:
+        for rows in db.execute(statement).partitions():
+            chunk = writer.write(export_rows(db, rows, archived))
+            if chunk:
+                yield chunk
+    last = writer.close()
+    if last:
+        yield last
+
+# Async-mode counterpart of export_chunks; each batch's tags and assignees load through the sync facade
+async def aexport_chunks(db, writer, queries):
+    for statement, archived in queries:
+        result = await db.stream(statement)
+        async for rows in result.partitions():
+            chunk = await db.run_sync(lambda session: writer.write(export_rows(session, rows, archived)))
+            if chunk:
+                yield chunk
+    last = writer.close()
+    if last:
+        yield last
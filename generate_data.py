@@ -0,0 +1,191 @@
+# Deterministic, parallel test-data generator.
+#
+# Rows are produced per chunk of users in a process pool and written with Core bulk
+# inserts, one transaction per chunk. The same seed and scale factors always produce
+# the same rows for a given --chunk-users, whatever the number of workers.
+#
+#   python generate_data.py --users 50000 --tasks-per-user 20 --teams 5000 --seed 1
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, func, insert, select
+from models import Base, Tag, Task, TaskAssignee, TaskTag, Team, TeamMember, User, compute_uid
+from search import drop_search_triggers, init_search, rebuild_search_index, supports_search
+from sync import drop_change_seq_triggers, init_change_seq
+from team_stats import drop_counter_triggers, init_counter_triggers, rebuild_team_counters
+
+STATUSES = ("Todo", "In Progress", "Done")
+WORDS = (
+    "api", "audit", "backlog", "billing", "bug", "cache", "client", "deploy", "design", "docs",
+    "export", "feature", "fix", "import", "index", "invoice", "login", "metrics", "migrate", "mobile",
+    "onboarding", "payment", "release", "report", "review", "search", "security", "signup", "sync", "test",
+)
+BASE_TIME = datetime(2024, 1, 1)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic task dataset")
+    parser.add_argument("--database-url", default=None, help="defaults to DATABASE_URL / sqlite:///./sql_app.db")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--teams-per-user", type=int, default=1)
+    parser.add_argument("--tasks-per-user", type=int, default=20)
+    parser.add_argument("--team-task-ratio", type=float, default=0.5, help="share of tasks that belong to a team")
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--tags-per-task", type=int, default=2, help="maximum tags per task")
+    parser.add_argument("--assignees-per-task", type=int, default=1, help="maximum assignees per team task")
+    parser.add_argument("--chunk-users", type=int, default=2000, help="users generated per chunk/transaction")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--keep-indexes", action="store_true", help="do not drop secondary indexes during the load")
+    return parser.parse_args(argv)
+
+# Build every row for users [first_user_id, last_user_id]; runs in a worker process.
+# Ids are offset past the rows already in the database, so loads can be stacked.
+def generate_chunk(options, offsets, first_user_id, last_user_id):
+    rng = random.Random(f"{options.seed}:{first_user_id}")
+    user_ids = range(offsets["users"] + 1, offsets["users"] + options.users + 1)
+    team_ids = range(offsets["teams"] + 1, offsets["teams"] + options.teams + 1)
+    tag_ids = range(offsets["tags"] + 1, offsets["tags"] + options.tags + 1)
+    rows = {"users": [], "team_members": [], "tasks": [], "task_tags": [], "task_assignees": []}
+    for user_index in range(first_user_id, last_user_id + 1):
+        user_id = offsets["users"] + user_index
+        username = f"{rng.choice(WORDS)}_{user_id}"
+        email = f"{username}@example.com"
+        rows["users"].append({
+            "user_id": user_id,
+            "username": username,
+            "email": email,
+            "uid": compute_uid(email, username),
+            "created_at": BASE_TIME + timedelta(seconds=rng.randrange(365 * 86400)),
+        })
+        teams = rng.sample(team_ids, min(options.teams_per_user, options.teams))
+        rows["team_members"].extend({"team_id": team_id, "user_id": user_id} for team_id in teams)
+
+        # Task ids depend only on the user, so chunks can be generated in any order
+        first_task_id = offsets["tasks"] + (user_index - 1) * options.tasks_per_user + 1
+        for task_id in range(first_task_id, first_task_id + options.tasks_per_user):
+            created_at = BASE_TIME + timedelta(seconds=rng.randrange(365 * 86400))
+            team_id = rng.choice(teams) if teams and rng.random() < options.team_task_ratio else None
+            rows["tasks"].append({
+                "task_id": task_id,
+                "title": " ".join(rng.choices(WORDS, k=3)),
+                "description": " ".join(rng.choices(WORDS, k=12)),
+                "status": rng.choice(STATUSES),
+                "due_date": (created_at + timedelta(days=rng.randint(1, 90))).date(),
+                "created_at": created_at,
+                "updated_at": created_at,
+                "created_by": user_id,
+                "team_id": team_id,
+            })
+            if options.tags:
+                tag_count = rng.randint(0, min(options.tags_per_task, options.tags))
+                rows["task_tags"].extend(
+                    {"task_id": task_id, "tag_id": tag_id} for tag_id in rng.sample(tag_ids, tag_count)
+                )
+            if team_id is not None:
+                assignee_count = rng.randint(0, min(options.assignees_per_task, options.users))
+                rows["task_assignees"].extend(
+                    {"task_id": task_id, "user_id": assignee} for assignee in rng.sample(user_ids, assignee_count)
+                )
+    return rows
+
+def generate(options):
+    from database import SYNC_DATABASE_URL
+
+    database_url = options.database_url or SYNC_DATABASE_URL
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        # synchronous=OFF only applies to the loader's own connections
+        @event.listens_for(engine, "connect")
+        def fast_load(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+    Base.metadata.create_all(engine)
+    # Building secondary indexes once after the load is much cheaper than maintaining them per row
+    indexes = [] if options.keep_indexes else [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    for index in indexes:
+        index.drop(bind=engine, checkfirst=True)
+    # Same for the full-text index, counters and change numbers: no per-row triggers, one
+    # rebuild at the end
+    search = supports_search(engine)
+    if search:
+        init_search(engine)
+        with engine.begin() as conn:
+            drop_search_triggers(conn)
+    with engine.begin() as conn:
+        drop_counter_triggers(conn)
+        drop_change_seq_triggers(conn)
+
+    rng = random.Random(f"{options.seed}:static")
+    with engine.begin() as conn:
+        offsets = {
+            "users": conn.execute(select(func.coalesce(func.max(User.user_id), 0))).scalar(),
+            "teams": conn.execute(select(func.coalesce(func.max(Team.team_id), 0))).scalar(),
+            "tags": conn.execute(select(func.coalesce(func.max(Tag.tag_id), 0))).scalar(),
+            "tasks": conn.execute(select(func.coalesce(func.max(Task.task_id), 0))).scalar(),
+        }
+        conn.execute(insert(Team), [
+            {"team_id": team_id, "team_name": f"{rng.choice(WORDS).title()} team {team_id}", "created_at": BASE_TIME}
+            for team_id in range(offsets["teams"] + 1, offsets["teams"] + options.teams + 1)
+        ])
+        if options.tags:
+            conn.execute(insert(Tag), [
+                {"tag_id": tag_id, "name": f"{rng.choice(WORDS)}-{tag_id}", "user_id": offsets["users"] + rng.randint(1, options.users), "team_id": None}
+                for tag_id in range(offsets["tags"] + 1, offsets["tags"] + options.tags + 1)
+            ])
+
+    chunks = [
+        (first, min(first + options.chunk_users - 1, options.users))
+        for first in range(1, options.users + 1, options.chunk_users)
+    ]
+    counts = dict.fromkeys(("users", "team_members", "tasks", "task_tags", "task_assignees"), 0)
+    tables = {"users": User, "team_members": TeamMember, "tasks": Task, "task_tags": TaskTag, "task_assignees": TaskAssignee}
+    with ProcessPoolExecutor(max_workers=options.workers) as pool:
+        # Bound the chunks in flight so generated rows never pile up ahead of the writer
+        pending = []
+        chunk_iter = iter(chunks)
+        for first, last in chunk_iter:
+            pending.append(pool.submit(generate_chunk, options, offsets, first, last))
+            if len(pending) >= options.workers * 2:
+                break
+        while pending:
+            rows = pending.pop(0).result()
+            next_chunk = next(chunk_iter, None)
+            if next_chunk is not None:
+                pending.append(pool.submit(generate_chunk, options, offsets, *next_chunk))
+            with engine.begin() as conn:
+                for name, model in tables.items():
+                    if rows[name]:
+                        conn.execute(insert(model), rows[name])
+                        counts[name] += len(rows[name])
+    for index in indexes:
+        index.create(bind=engine, checkfirst=True)
+    if search:
+        with engine.begin() as conn:
+            rebuild_search_index(conn)
+        init_search(engine)
+    with engine.begin() as conn:
+        rebuild_team_counters(conn)
+        init_counter_triggers(conn)
+        init_change_seq(conn)
+    engine.dispose()
+    return counts
+
+def main(argv=None):
+    options = parse_args(argv)
+    started = time.perf_counter()
+    counts = generate(options)
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+    print(f"Generated {options.teams} teams, {options.tags} tags, {summary} in {elapsed:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+request_logger = logging.getLogger("task_app.requests")
+slow_query_logger = logging.getLogger("task_app.slow_queries")
+
+# Statements slower than this are written to the slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Histogram bucket bounds, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Per-request counters, set by the middleware and filled in by engine events, TimedRoute
+# and the JSON encoders in serialization.py
+class RequestStats:
+    __slots__ = ("route", "statements", "db_time", "endpoint_time", "serialization_time")
+
+    def __init__(self):
+        self.route = None
+        self.statements = 0
+        self.db_time = 0.0
+        self.endpoint_time = 0.0
+        # Time spent encoding response bodies, including the chunks of streamed
+        # responses, which are encoded after the endpoint returns
+        self.serialization_time = 0.0
+
+current_stats = contextvars.ContextVar("request_stats", default=None)
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+# Per (method, route) histograms of total, database and serialization time
+class RouteMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, method, route, duration, stats):
+        with self.lock:
+            entry = self.routes.get((method, route))
+            if entry is None:
+                entry = self.routes[(method, route)] = {
+                    "duration": Histogram(),
+                    "db": Histogram(),
+                    "serialization": Histogram(),
+                    "statements": 0,
+                }
+            entry["duration"].observe(duration)
+            entry["db"].observe(stats.db_time)
+            entry["serialization"].observe(stats.serialization_time)
+            entry["statements"] += stats.statements
+
+    def render(self, extra_gauges=()):
+        lines = []
+        with self.lock:
+            for metric, name, help_text in (
+                ("duration", "task_app_request_duration_seconds", "Request duration"),
+                ("db", "task_app_request_db_seconds", "Time spent in database statements per request"),
+                ("serialization", "task_app_request_serialization_seconds", "Time spent encoding response bodies per request"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (method, route), entry in sorted(self.routes.items()):
+                    lines += entry[metric].render(name, f'method="{method}",route="{route}"')
+            lines += ["# HELP task_app_request_statements_total SQL statements issued", "# TYPE task_app_request_statements_total counter"]
+            for (method, route), entry in sorted(self.routes.items()):
+                lines.append(f'task_app_request_statements_total{{method="{method}",route="{route}"}} {entry["statements"]}')
+        for name, value in extra_gauges:
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+route_metrics = RouteMetrics()
+
+# Count and time every statement on the engine, attributing it to the current request
+def instrument_engine(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_query_logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(elapsed * 1000, 3),
+            "route": stats.route if stats is not None else None,
+            "executemany": executemany,
+            "statement": " ".join(statement.split()),
+        }))
+
+# APIRoute that times the endpoint body and labels the request with its route
+class TimedRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route_path = self.path
+
+        async def labelled_handler(request):
+            stats = current_stats.get()
+            if stats is not None:
+                stats.route = route_path
+            return await handler(request)
+
+        return labelled_handler
+
+def timed_endpoint(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                record_endpoint_time(time.perf_counter() - started)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            record_endpoint_time(time.perf_counter() - started)
+    return wrapper
+
+def record_endpoint_time(elapsed):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.endpoint_time += elapsed
+
+def record_serialization_time(elapsed):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.serialization_time += elapsed
+
+# Count the decorated encoder's run time as serialization time of the current request
+def timed_serialization(encode):
+    @functools.wraps(encode)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return encode(*args, **kwargs)
+        finally:
+            record_serialization_time(time.perf_counter() - started)
+    return wrapper
+
+# Bodies are mostly encoded inside the endpoint, so "app" leaves both database and
+# encoding time out; a streamed body is encoded after the header is sent, and only its
+# log line and histogram include that time
+def server_timing(stats, total):
+    return (
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.statements} statements", '
+        f"app;dur={max(stats.endpoint_time - stats.db_time - stats.serialization_time, 0.0) * 1000:.2f}, "
+        f"ser;dur={stats.serialization_time * 1000:.2f}, "
+        f"total;dur={total * 1000:.2f}"
+    )
+
+# ASGI middleware: per-request statement count, DB time and serialization time,
+# emitted as a Server-Timing header, a structured log line and route histograms
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            duration = time.perf_counter() - started
+            route = stats.route or "unmatched"
+            route_metrics.record(scope["method"], route, duration, stats)
+            request_logger.info(json.dumps({
+                "event": "request",
+                "method": scope["method"],
+                "route": route,
+                "status": status[0],
+                "duration_ms": round(duration * 1000, 3),
+                "db_ms": round(stats.db_time * 1000, 3),
+                "statements": stats.statements,
+                "serialization_ms": round(stats.serialization_time * 1000, 3),
+            }))
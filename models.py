@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, UniqueConstraint, event
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -7,6 +7,14 @@ import base64
 
 Base = declarative_base()
 
+# Derive a user's public uid from their email and username
+def compute_uid(email, username):
+    combined = email + username
+    hash_object = hashlib.sha256(combined.encode())
+    hex_dig = hash_object.hexdigest()
+    b64_encoded = base64.b64encode(bytes.fromhex(hex_dig)).decode()
+    return b64_encoded[:10]
+
 class User(Base):
     __tablename__ = "users"
 
@@ -25,12 +33,7 @@ class User(Base):
         self.email = email
         self.username = username
         if self.email and self.username:
-            combined = self.email + self.username
-            hash_object = hashlib.sha256(combined.encode())
-            hex_dig = hash_object.hexdigest()
-            b64_encoded = base64.b64encode(bytes.fromhex(hex_dig)).decode()
-            uid = b64_encoded[:10]
-            self.uid = uid
+            self.uid = compute_uid(self.email, self.username)
         
 class Team(Base):
     __tablename__ = "teams"
@@ -49,6 +52,9 @@ class TeamMember(Base):
     team_id = Column(Integer, ForeignKey("teams.team_id"), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
 
+    # The primary key covers lookups by team; this one covers "teams of a user"
+    __table_args__ = (Index("ix_team_members_user_id", "user_id", "team_id"),)
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -61,18 +67,43 @@ class Task(Base):
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     created_by = Column(Integer, ForeignKey("users.user_id"))
     team_id = Column(Integer, ForeignKey("teams.team_id"), nullable=True)
+    # Position in commit order among all task writes, assigned by triggers (see sync.py)
+    change_seq = Column(Integer)
 
     creator = relationship("User", back_populates="created_tasks")
     team = relationship("Team", back_populates="tasks")
-    assignees = relationship("User", secondary="task_assignees", back_populates="assigned_tasks")
-    tags = relationship("Tag", secondary="task_tags", back_populates="tasks")
+    # Join rows go with the task: ON DELETE CASCADE where foreign keys are enforced, and
+    # explicit deletes in delete_task and the archiver, so the ORM never loads them to delete
+    assignees = relationship("User", secondary="task_assignees", back_populates="assigned_tasks", passive_deletes=True)
+    tags = relationship("Tag", secondary="task_tags", back_populates="tasks", passive_deletes=True)
+
+    __table_args__ = (
+        # Personal task listing: filter on creator/team, keyset order on (created_at, task_id)
+        Index("ix_tasks_created_by_team_id", "created_by", "team_id", "created_at", "task_id"),
+        # Team listing; with updated_at these also cover the version stamps behind listing ETags
+        Index("ix_tasks_team_id_updated_at", "team_id", "updated_at"),
+        Index("ix_tasks_created_by_updated_at", "created_by", "team_id", "updated_at"),
+        # Archival candidates: finished tasks by age
+        Index("ix_tasks_status_updated_at", "status", "updated_at"),
+        # Reminder windows across all tasks, and a team's overdue tasks
+        Index("ix_tasks_due_date_status", "due_date", "status"),
+        Index("ix_tasks_team_id_due_date", "team_id", "due_date"),
+        # Delta sync: the sync scopes in change order
+        Index("ix_tasks_team_id_change_seq", "team_id", "change_seq"),
+        Index("ix_tasks_created_by_change_seq", "created_by", "team_id", "change_seq"),
+        # Ids are never handed out twice, even after the newest task is deleted or
+        # archived, so archive ids, tombstones and sync cursors stay unambiguous
+        {"sqlite_autoincrement": True},
+    )
 
 class TaskAssignee(Base):
     __tablename__ = "task_assignees"
 
-    task_id = Column(Integer, ForeignKey("tasks.task_id"), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
 
+    __table_args__ = (Index("ix_task_assignees_user_id", "user_id", "task_id"),)
+
 class Tag(Base):
     __tablename__ = "tags"
 
@@ -85,10 +116,92 @@ class Tag(Base):
     team = relationship("Team", back_populates="tags", uselist=False)
     tasks = relationship("Task", secondary="task_tags", back_populates="tags")
 
-    __table_args__ = (UniqueConstraint('name', 'user_id', 'team_id', name='uix_tag_name_user_team'),)
+    __table_args__ = (
+        UniqueConstraint('name', 'user_id', 'team_id', name='uix_tag_name_user_team'),
+        Index("ix_tags_name", "name"),
+        # Tags a user or team owns, for tag suggestions
+        Index("ix_tags_user_id", "user_id", "team_id"),
+        Index("ix_tags_team_id", "team_id"),
+    )
 
 class TaskTag(Base):
     __tablename__ = "task_tags"
 
-    task_id = Column(Integer, ForeignKey("tasks.task_id"), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id", ondelete="CASCADE"), primary_key=True)
     tag_id = Column(Integer, ForeignKey("tags.tag_id"), primary_key=True)
+
+    __table_args__ = (Index("ix_task_tags_tag_id", "tag_id", "task_id"),)
+
+# Cold storage for archived tasks (see archive.py): the columns of tasks plus archived_at,
+# keeping the original task ids, with their tag and assignee rows moved alongside
+class ArchivedTask(Base):
+    __tablename__ = "tasks_archive"
+
+    task_id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = Column(String)
+    status = Column(String(20), nullable=False)
+    due_date = Column(Date)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    created_by = Column(Integer)
+    team_id = Column(Integer, nullable=True)
+    change_seq = Column(Integer)
+    archived_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index("ix_tasks_archive_created_by", "created_by", "team_id", "created_at", "task_id"),
+        Index("ix_tasks_archive_team_id", "team_id", "task_id"),
+    )
+
+class ArchivedTaskTag(Base):
+    __tablename__ = "task_tags_archive"
+
+    task_id = Column(Integer, ForeignKey("tasks_archive.task_id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.tag_id"), primary_key=True)
+
+class ArchivedTaskAssignee(Base):
+    __tablename__ = "task_assignees_archive"
+
+    task_id = Column(Integer, ForeignKey("tasks_archive.task_id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+
+# Deletions recorded for /sync: a deleted task, or an assignee removed from a task.
+# Ids only grow (AUTOINCREMENT), so they can serve as a sync cursor even after pruning.
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+
+    tombstone_id = Column(Integer, primary_key=True)
+    kind = Column(String(10), nullable=False)
+    task_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    created_by = Column(Integer)
+    team_id = Column(Integer, nullable=True)
+    deleted_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        # Same scopes as the task listings, each in cursor order
+        Index("ix_tombstones_created_by", "created_by", "team_id", "tombstone_id"),
+        Index("ix_tombstones_team_id", "team_id", "tombstone_id"),
+        Index("ix_tombstones_deleted_at", "deleted_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+# Last change_seq handed out, one row per sequence; it only grows, so a sequence number
+# is never reused after the task that had it is deleted or archived
+class ChangeSequence(Base):
+    __tablename__ = "change_sequence"
+
+    name = Column(String(20), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+# Write-maintained aggregates behind the team dashboard endpoints (see team_stats.py).
+# One row per team and counter: "status" rows count tasks by status, "due" rows count
+# open tasks by due date, and the "members" row counts team members.
+class TeamCounter(Base):
+    __tablename__ = "team_counters"
+
+    team_id = Column(Integer, primary_key=True)
+    kind = Column(String(10), primary_key=True)
+    key = Column(String(20), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
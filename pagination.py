@@ -0,0 +1,28 @@
+import base64
+import json
+from datetime import datetime
+
+
+# Encode a keyset position as an opaque, url-safe cursor string
+def encode_cursor(*values):
+    parts = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(parts, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Decode a cursor produced by encode_cursor, raising ValueError on malformed input
+def decode_cursor(cursor, *types):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(parts, list) or len(parts) != len(types):
+        raise ValueError("Malformed cursor")
+    values = []
+    for part, kind in zip(parts, types):
+        try:
+            values.append(datetime.fromisoformat(part) if kind is datetime else kind(part))
+        except (TypeError, ValueError) as e:
+            raise ValueError("Malformed cursor") from e
+    return tuple(values)
@@ -0,0 +1,189 @@
+# Due-date reminders.
+#
+# The scheduler keeps a heap of upcoming fire times for open tasks due within a short
+# window: "task.due_soon" REMINDER_LEAD_HOURS before the due date starts and
+# "task.overdue" once it has passed. The window is loaded through the (due_date, status)
+# index and refreshed every REMINDER_REFRESH_SECONDS with the days that come into it and
+# the tasks in it updated since the last refresh, so new and changed tasks are picked up
+# whichever worker wrote them, without reading the rest of the table. Due reminders are
+# re-checked against their tasks by primary key and handed to the sink in batches.
+#
+# The app runs the scheduler when REMINDERS_ENABLED=1. With several workers, run it in
+# one process instead, so each reminder fires once:
+#
+#   python reminders.py run
+import asyncio
+import heapq
+import logging
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select
+from starlette.concurrency import run_in_threadpool
+from models import Task
+from serialization import columns, dumps
+from team_stats import DONE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+DUE_SOON = "task.due_soon"
+OVERDUE = "task.overdue"
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "0") == "1"
+REMINDER_LEAD = timedelta(hours=float(os.getenv("REMINDER_LEAD_HOURS", "24")))
+# Days of due dates held in memory beyond the lead time
+REMINDER_WINDOW_DAYS = int(os.getenv("REMINDER_WINDOW_DAYS", "2"))
+REMINDER_REFRESH_SECONDS = float(os.getenv("REMINDER_REFRESH_SECONDS", "30"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Rows updated this long before a refresh started are read again by the next one, so
+# writes that commit while a refresh runs aren't missed
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+REMINDER_FIELDS = ("task_id", "status", "due_date", "created_by", "team_id")
+
+# Sinks receive each batch of reminders as a list of dicts
+class LogSink:
+    def emit(self, reminders):
+        logger.info(dumps({"event": "reminders", "reminders": reminders}).decode())
+
+# Keeps the latest batches for an in-process consumer
+class QueueSink:
+    def __init__(self, maxlen=10000):
+        self.batches = deque(maxlen=maxlen)
+
+    def emit(self, reminders):
+        self.batches.append(reminders)
+
+def make_sink():
+    return QueueSink() if os.getenv("REMINDER_SINK", "log") == "queue" else LogSink()
+
+# When each kind of reminder for a due date fires
+def fire_times(due_date, lead=REMINDER_LEAD):
+    start = datetime(due_date.year, due_date.month, due_date.day)
+    return [(start - lead, DUE_SOON), (start + timedelta(days=1), OVERDUE)]
+
+class ReminderScheduler:
+    def __init__(self, sink, lead=REMINDER_LEAD, window_days=REMINDER_WINDOW_DAYS, batch_size=REMINDER_BATCH_SIZE):
+        self.sink = sink
+        self.lead = lead
+        self.window_days = window_days
+        self.batch_size = batch_size
+        # (fire_at, kind, task_id, due_date)
+        self.heap = []
+        # (kind, task_id, due_date) keys in the heap and already fired, so reloads don't repeat them
+        self.scheduled = set()
+        self.fired = set()
+        self.loaded_until = None
+        self.refreshed_at = None
+        self.fired_count = 0
+
+    def window_end(self, now):
+        return (now + self.lead).date() + timedelta(days=self.window_days)
+
+    # Schedule a task's reminders; a due-soon time that already passed fires on the next pass
+    def push(self, task_id, due_date):
+        for fire_at, kind in fire_times(due_date, self.lead):
+            key = (kind, task_id, due_date)
+            if key in self.scheduled or key in self.fired:
+                continue
+            self.scheduled.add(key)
+            heapq.heappush(self.heap, (fire_at, kind, task_id, due_date))
+
+    # Load the days that entered the window and the tasks in it updated since the last refresh
+    def refresh(self, db, now=None):
+        now = now or datetime.now()
+        today = now.date()
+        end = self.window_end(now)
+        query = select(Task.task_id, Task.due_date).filter(
+            Task.due_date >= today,
+            Task.due_date <= end,
+            Task.status.notin_(DONE_STATUSES)
+        )
+        if self.loaded_until is not None:
+            query = query.filter(or_(Task.due_date > self.loaded_until, Task.updated_at > self.refreshed_at - REFRESH_OVERLAP))
+        for task_id, due_date in db.execute(query):
+            self.push(task_id, due_date)
+        self.loaded_until = end
+        self.refreshed_at = now
+        # Keys of past due dates can't come back
+        self.fired = {key for key in self.fired if key[2] >= today - timedelta(days=1)}
+
+    def next_fire_at(self):
+        return self.heap[0][0] if self.heap else None
+
+    # Emit every reminder due by now, checked against the current task rows. Returns the number sent.
+    def fire_due(self, db, now=None):
+        now = now or datetime.now()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            fire_at, kind, task_id, due_date = heapq.heappop(self.heap)
+            self.scheduled.discard((kind, task_id, due_date))
+            due.append((kind, task_id, due_date))
+        sent = 0
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            tasks = {
+                row.task_id: row
+                for row in db.execute(select(*columns(Task, REMINDER_FIELDS)).filter(
+                    Task.task_id.in_({task_id for _, task_id, _ in batch})
+                ))
+            }
+            reminders = []
+            for kind, task_id, due_date in batch:
+                task = tasks.get(task_id)
+                # Deleted, archived, closed or moved to another date since it was loaded
+                if task is None or task.status in DONE_STATUSES or task.due_date != due_date:
+                    continue
+                self.fired.add((kind, task_id, due_date))
+                reminders.append({"type": kind, **dict(zip(REMINDER_FIELDS, task))})
+            if reminders:
+                self.sink.emit(reminders)
+                sent += len(reminders)
+        self.fired_count += sent
+        return sent
+
+    # One scheduler pass in its own session: refresh when due, then fire. Returns seconds until the next pass.
+    def step(self, session_factory, refresh_seconds=REMINDER_REFRESH_SECONDS):
+        now = datetime.now()
+        with session_factory() as db:
+            if self.refreshed_at is None or now - self.refreshed_at >= timedelta(seconds=refresh_seconds):
+                self.refresh(db, now)
+            self.fire_due(db, now)
+        wait = refresh_seconds - (datetime.now() - self.refreshed_at).total_seconds()
+        next_fire_at = self.next_fire_at()
+        if next_fire_at is not None:
+            wait = min(wait, (next_fire_at - datetime.now()).total_seconds())
+        # Capped, so a clock set back doesn't stall the loop
+        return min(max(wait, 0.0), refresh_seconds)
+
+    # Background loop started by the app; each pass runs in the threadpool
+    async def run(self, session_factory):
+        while True:
+            try:
+                wait = await run_in_threadpool(self.step, session_factory)
+            except Exception:
+                logger.exception("Reminder pass failed")
+                wait = REMINDER_REFRESH_SECONDS
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        return {"scheduled": len(self.heap), "fired": self.fired_count}
+
+reminder_scheduler = ReminderScheduler(make_sink())
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["run"]:
+        print("usage: python reminders.py run")
+        return 2
+    from database import SessionLocal, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    while True:
+        time.sleep(reminder_scheduler.step(SessionLocal))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CachedResponse = namedtuple("CachedResponse", ["etag", "body", "headers", "stored_at"])
+
+# Strong ETag for one variant (query string) of a scope's listing at a given version stamp
+def make_etag(scope, variant, stamp):
+    digest = hashlib.blake2b(repr((scope, variant, stamp)).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+# True when an If-None-Match header value matches the ETag
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+# Rendered listing responses keyed by (scope, variant), where a scope is ("team", id)
+# or ("user", id). Writes drop every variant of the scopes they touch. Bounded by entry
+# count and by the total size of the bodies, least recently used first; a body larger
+# than the whole budget isn't cached.
+class ResponseCache:
+    def __init__(self, maxsize=1000, maxbytes=64 * 1024 * 1024, trust_seconds=0.0):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.size = 0
+        # Entries younger than this are served without re-checking the version stamp.
+        # Writes in this process always invalidate; other workers' writes are only
+        # noticed through the stamp, so keep this at 0 when running several workers.
+        self.trust_seconds = trust_seconds
+        self.entries = OrderedDict()
+        self.scopes = {}
+        self.lock = threading.Lock()
+
+    def get(self, scope, variant):
+        with self.lock:
+            entry = self.entries.get((scope, variant))
+            if entry is not None:
+                self.entries.move_to_end((scope, variant))
+            return entry
+
+    def is_trusted(self, entry):
+        return entry is not None and time.monotonic() - entry.stored_at < self.trust_seconds
+
+    def put(self, scope, variant, etag, body, headers=None):
+        entry = CachedResponse(etag, body, headers or {}, time.monotonic())
+        with self.lock:
+            self.discard(scope, variant)
+            if len(body) > self.maxbytes:
+                return entry
+            self.entries[(scope, variant)] = entry
+            self.size += len(body)
+            self.scopes.setdefault(scope, set()).add(variant)
+            while len(self.entries) > self.maxsize or self.size > self.maxbytes:
+                old_scope, old_variant = next(iter(self.entries))
+                self.discard(old_scope, old_variant)
+        return entry
+
+    # Drop one entry; the caller holds the lock
+    def discard(self, scope, variant):
+        entry = self.entries.pop((scope, variant), None)
+        if entry is None:
+            return
+        self.size -= len(entry.body)
+        variants = self.scopes.get(scope)
+        if variants is not None:
+            variants.discard(variant)
+            if not variants:
+                del self.scopes[scope]
+
+    def invalidate(self, *scopes):
+        with self.lock:
+            for scope in scopes:
+                for variant in list(self.scopes.get(scope, ())):
+                    self.discard(scope, variant)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.scopes.clear()
+            self.size = 0
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1000")),
+    maxbytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024))),
+    trust_seconds=float(os.getenv("RESPONSE_CACHE_TRUST_SECONDS", "0"))
+)
@@ -0,0 +1,3 @@
+#!/bin/sh
+# Set up the schema once, then serve with one worker process per core (see serve.py)
+exec python serve.py "$@"
@@ -0,0 +1,144 @@
+import unicodedata
+from sqlalchemy import bindparam, inspect, text
+
+# External-content FTS5 index over tasks.title and tasks.description. Each row also
+# carries one scope token, "u<user_id>" for personal tasks or "t<team_id>" for team
+# tasks, so a scoped search is a doclist intersection inside the index instead of a
+# probe per task of the scope. Triggers keep it in sync with every insert, update and
+# delete, whether it comes from the ORM or Core.
+FTS_TABLE = "tasks_fts"
+CONTENT_VIEW = "tasks_fts_content"
+# Prefix lengths with their own index; longer prefixes match fewer words and are
+# looked up in the term index directly
+PREFIX_LENGTHS = (2, 3)
+
+def scope_token(row):
+    return f"CASE WHEN {row}team_id IS NULL OR {row}team_id = '' THEN 'u' || {row}created_by ELSE 't' || {row}team_id END"
+
+FTS_STATEMENTS = (
+    f"""CREATE VIEW IF NOT EXISTS {CONTENT_VIEW} AS
+        SELECT task_id, title, description, {scope_token("")} AS scope FROM tasks""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, scope, content='{CONTENT_VIEW}', content_rowid='task_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='{" ".join(map(str, PREFIX_LENGTHS))}')""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, scope)
+        VALUES (new.task_id, new.title, new.description, {scope_token("new.")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, scope)
+        VALUES ('delete', old.task_id, old.title, old.description, {scope_token("old.")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description, created_by, team_id ON tasks BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, scope)
+        VALUES ('delete', old.task_id, old.title, old.description, {scope_token("old.")});
+        INSERT INTO {FTS_TABLE}(rowid, title, description, scope)
+        VALUES (new.task_id, new.title, new.description, {scope_token("new.")});
+    END""",
+)
+
+TRIGGERS = ("tasks_fts_insert", "tasks_fts_delete", "tasks_fts_update")
+
+# bm25() weights of the title, description and scope columns; title matches weigh more
+# than description matches, and the scope token every match carries doesn't count
+COLUMN_WEIGHTS = (10.0, 1.0, 0.0)
+
+def supports_search(engine):
+    return engine.dialect.name == "sqlite"
+
+# Create the index and triggers; a newly created index is filled from existing rows
+def init_search(engine):
+    if not supports_search(engine):
+        return
+    created = not inspect(engine).has_table(FTS_TABLE)
+    with engine.begin() as conn:
+        for statement in FTS_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        if created:
+            rebuild_search_index(conn)
+
+def rebuild_search_index(conn):
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+# Bulk loaders drop the triggers and rebuild the index once at the end
+def drop_search_triggers(conn):
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+# Lowercased, accent-stripped form of a token, as the unicode61 tokenizer indexes it
+def fold(word):
+    return "".join(c for c in unicodedata.normalize("NFKD", word.lower()) if not unicodedata.combining(c))
+
+# Free text to search terms. Every word is matched as a quoted phrase so user input
+# can't inject query syntax, and the last word matches as a prefix for search-as-you-type
+# once it is long enough to have a prefix index.
+def search_terms(q):
+    words = q.split()
+    return [
+        (word, index == len(words) - 1 and len(fold(word)) >= PREFIX_LENGTHS[0])
+        for index, word in enumerate(words)
+    ]
+
+def term_query(word, prefix):
+    return '"' + word.replace('"', '""') + '"' + ("*" if prefix else "")
+
+def match_query(scope, terms):
+    text_terms = " ".join(term_query(word, prefix) for word, prefix in terms)
+    return f'scope : "{scope}" AND {{title description}} : ({text_terms})'
+
+# Ranked, paginated search within one user's personal tasks or one team's tasks.
+# SQLite ranks the matches with bm25() and returns only the requested page, which is
+# then joined to tasks; highlights and snippets are computed for that page alone.
+def search_tasks(db, q, user_id=None, team_id=None, limit=20, offset=0, highlight=False):
+    terms = search_terms(q)
+    if not terms:
+        return []
+    scope = f"u{user_id}" if user_id is not None else f"t{team_id}"
+    match = match_query(scope, terms)
+    weights = ", ".join(map(str, COLUMN_WEIGHTS))
+    rows = db.execute(text(f"""
+        SELECT tasks.task_id, tasks.title, tasks.status, tasks.due_date, tasks.created_by, tasks.team_id, page.score
+        FROM (
+            SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH :match
+            ORDER BY score, rowid LIMIT :limit OFFSET :offset
+        ) AS page CROSS JOIN tasks ON tasks.task_id = page.rowid
+        ORDER BY page.score, page.rowid
+    """), {"match": match, "limit": limit, "offset": offset}).mappings().all()
+
+    marked = {}
+    if highlight and rows:
+        task_ids = [row["task_id"] for row in rows]
+        # One pass over the page's rowid range: FTS5 would run the match again for every
+        # id of a plain rowid IN, which re-merges the doclists of a prefix term each time.
+        # The unary + keeps the IN out of the index, so SQLite filters the range down to
+        # the page before highlight() and snippet() run.
+        marked = {
+            row.rowid: row
+            for row in db.execute(text(f"""
+                SELECT rowid, highlight({FTS_TABLE}, 0, '<mark>', '</mark>') AS title_highlight,
+                       snippet({FTS_TABLE}, 1, '<mark>', '</mark>', '…', 12) AS description_snippet
+                FROM {FTS_TABLE}
+                WHERE {FTS_TABLE} MATCH :match AND rowid BETWEEN :first AND :last AND +rowid IN :task_ids
+            """).bindparams(bindparam("task_ids", expanding=True)),
+                {"match": match, "first": min(task_ids), "last": max(task_ids), "task_ids": task_ids})
+        }
+    results = []
+    for row in rows:
+        result = {
+            "task_id": row["task_id"],
+            "title": row["title"],
+            "status": row["status"],
+            "due_date": row["due_date"],
+            "created_by": row["created_by"],
+            "team_id": row["team_id"],
+            # bm25() is lower for better matches
+            "score": round(-row["score"], 6),
+            "title_highlight": None,
+            "description_snippet": None,
+        }
+        if row["task_id"] in marked:
+            result["title_highlight"] = marked[row["task_id"]].title_highlight
+            result["description_snippet"] = marked[row["task_id"]].description_snippet
+        results.append(result)
+    return results
@@ -0,0 +1,100 @@
+# Response serialization without a second pass through Pydantic.
+#
+# Endpoints build plain dicts straight from ORM instances or Core result tuples and
+# return them in an ORJSONResponse. FastAPI doesn't validate or re-encode a returned
+# Response, so each response body is built and encoded exactly once; the routes keep
+# their response_model for the OpenAPI schema. The field tuples below list the fields
+# of the matching Pydantic models in app.py, in the same order. Encoding time is
+# recorded as the request's serialization time (see instrumentation.py).
+import orjson
+from fastapi.responses import Response
+from sqlalchemy import select
+from instrumentation import timed_serialization
+from models import ArchivedTaskAssignee, ArchivedTaskTag, Tag, TaskAssignee, TaskTag, User
+
+USER_FIELDS = ("user_id", "username", "email", "uid", "created_at")
+MEMBER_FIELDS = ("user_id", "username", "email")
+TEAM_FIELDS = ("team_id", "team_name", "created_at")
+TAG_FIELDS = ("tag_id", "name", "user_id", "team_id")
+TASK_FIELDS = ("task_id", "title", "description", "status", "due_date", "created_at", "updated_at", "created_by")
+SYNC_TASK_FIELDS = TASK_FIELDS + ("team_id",)
+DELETION_FIELDS = ("kind", "task_id", "user_id", "deleted_at")
+
+# Task ids per IN list when loading tags or assignees, as selectinload batches them
+LOAD_BATCH_SIZE = 500
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps(content)
+
+@timed_serialization
+def dumps(content):
+    return orjson.dumps(content)
+
+# NDJSON body chunk, one object per line
+@timed_serialization
+def dumps_lines(items):
+    return b"".join([orjson.dumps(item) + b"\n" for item in items])
+
+# Model columns for a Core select whose rows zip with fields
+def columns(model, fields):
+    return [getattr(model, field) for field in fields]
+
+def as_dict(obj, fields):
+    return {field: getattr(obj, field) for field in fields}
+
+# Related rows of many tasks as {task_id: [dict, ...]}. statement(task_ids) selects the
+# task id followed by the related fields, the first being the related row's key; a row
+# shared by several tasks is built once.
+def load_grouped(db, task_ids, statement, fields):
+    grouped = {task_id: [] for task_id in task_ids}
+    built = {}
+    for start in range(0, len(task_ids), LOAD_BATCH_SIZE):
+        for task_id, *values in db.execute(statement(task_ids[start:start + LOAD_BATCH_SIZE])):
+            item = built.get(values[0])
+            if item is None:
+                item = built[values[0]] = dict(zip(fields, values))
+            grouped[task_id].append(item)
+    return grouped
+
+# archived=True reads the join rows of archived tasks
+def load_tags(db, task_ids, archived=False):
+    link = ArchivedTaskTag if archived else TaskTag
+    return load_grouped(db, task_ids, lambda batch: select(link.task_id, *columns(Tag, TAG_FIELDS)).join(
+        Tag, Tag.tag_id == link.tag_id
+    ).filter(link.task_id.in_(batch)), TAG_FIELDS)
+
+def load_assignees(db, task_ids, archived=False):
+    link = ArchivedTaskAssignee if archived else TaskAssignee
+    return load_grouped(db, task_ids, lambda batch: select(link.task_id, *columns(User, USER_FIELDS)).join(
+        User, User.user_id == link.user_id
+    ).filter(link.task_id.in_(batch)), USER_FIELDS)
+
+# PersonalTaskResponse of an ORM task and its loaded tags
+def personal_task_dict(task):
+    body = as_dict(task, TASK_FIELDS)
+    body["tags"] = [as_dict(tag, TAG_FIELDS) for tag in task.tags]
+    return body
+
+# PersonalTaskResponse bodies from rows of columns(Task, TASK_FIELDS), or of
+# columns(ArchivedTask, TASK_FIELDS) with archived=True
+def personal_task_dicts(db, rows, archived=False):
+    tasks = [dict(zip(TASK_FIELDS, row)) for row in rows]
+    tags = load_tags(db, [task["task_id"] for task in tasks], archived)
+    for task in tasks:
+        task["tags"] = tags[task["task_id"]]
+    return tasks
+
+# TeamTaskResponse bodies from rows as for personal_task_dicts; team is the team's dict
+def team_task_dicts(db, rows, team, archived=False):
+    tasks = [dict(zip(TASK_FIELDS, row)) for row in rows]
+    task_ids = [task["task_id"] for task in tasks]
+    assignees = load_assignees(db, task_ids, archived)
+    tags = load_tags(db, task_ids, archived)
+    for task in tasks:
+        task["team"] = team
+        task["assignees"] = assignees[task["task_id"]]
+        task["tags"] = tags[task["task_id"]]
+    return tasks
@@ -0,0 +1,44 @@
+# Multi-worker launcher.
+#
+# Sets up the schema once in this process, then starts uvicorn with one worker process
+# per core. Workers are spawned, not forked, and each imports app:app itself, so the
+# engines, connection pools and caches created at import are the worker's own. They skip
+# schema setup at startup since it has already run here. Live events reach every
+# worker through a shared EVENTS_BROKER_DIR, created here if it isn't set.
+#
+#   python serve.py [--workers 8] [--host 0.0.0.0] [--port 8000]
+import argparse
+import os
+import sys
+import tempfile
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API with one worker process per core")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    options = parse_args(argv)
+    import uvicorn
+    from database import dispose_engines, init_db
+
+    init_db()
+    # Nothing in this process uses the database from here on
+    dispose_engines()
+    os.environ["DB_INIT_ON_STARTUP"] = "0"
+    if options.workers > 1 and not os.getenv("EVENTS_BROKER_DIR"):
+        os.environ["EVENTS_BROKER_DIR"] = tempfile.mkdtemp(prefix="task-app-events-")
+    uvicorn.run(
+        "app:app",
+        host=options.host,
+        port=options.port,
+        workers=options.workers,
+        log_level=options.log_level,
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# Change sequence and tombstones for the delta-sync endpoint (GET /sync).
+#
+# Task changes are found through Task.change_seq. Triggers give every inserted or updated
+# task the next number of the "tasks" change sequence while the writing transaction holds
+# SQLite's write lock, so numbers follow commit order: a cursor never skips a change that
+# commits after a sync read but was stamped (updated_at) before it. What can't be found
+# that way, deleted tasks and removed assignees, is recorded as tombstones, whose ids are
+# handed out under the same lock. Tombstones older than SYNC_RETENTION_DAYS are pruned,
+# and cursors older than that are refused so the client knows to start over with a full sync.
+#
+#   python sync.py prune
+import os
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert
+from models import ChangeSequence, Tombstone
+
+TASK_DELETED = "task"
+ASSIGNEE_REMOVED = "assignee"
+
+SYNC_RETENTION = timedelta(days=float(os.getenv("SYNC_RETENTION_DAYS", "30")))
+
+def task_deleted(task):
+    return Tombstone(kind=TASK_DELETED, task_id=task.task_id, created_by=task.created_by, team_id=task.team_id)
+
+def assignee_removed(task, user_id):
+    return Tombstone(kind=ASSIGNEE_REMOVED, task_id=task.task_id, user_id=user_id, created_by=task.created_by, team_id=task.team_id)
+
+TASK_SEQUENCE = "tasks"
+
+NEXT_CHANGE_SEQ = f"""
+        UPDATE change_sequence SET value = value + 1 WHERE name = '{TASK_SEQUENCE}';
+        UPDATE tasks SET change_seq = (SELECT value FROM change_sequence WHERE name = '{TASK_SEQUENCE}')
+        WHERE task_id = new.task_id;"""
+
+CHANGE_SEQ_STATEMENTS = (
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_change_seq_insert AFTER INSERT ON tasks BEGIN{NEXT_CHANGE_SEQ}
+    END""",
+    # The insert trigger's own update changes change_seq, so it doesn't number the row twice
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_change_seq_update AFTER UPDATE ON tasks
+    WHEN new.change_seq IS old.change_seq BEGIN{NEXT_CHANGE_SEQ}
+    END""",
+)
+
+CHANGE_SEQ_TRIGGERS = ("tasks_change_seq_insert", "tasks_change_seq_update")
+
+# Bulk loaders drop the triggers and call init_change_seq once at the end
+def drop_change_seq_triggers(conn):
+    for trigger in CHANGE_SEQ_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+# Create the sequence row and triggers, and number the tasks written without them
+def init_change_seq(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(insert(ChangeSequence).prefix_with("OR IGNORE"), {"name": TASK_SEQUENCE, "value": 0})
+    number_changes(conn)
+    for statement in CHANGE_SEQ_STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+# Number the tasks that have no change_seq yet (a migrated table, or a bulk load that ran
+# without the triggers) after every number handed out, in (updated_at, task_id) order
+def number_changes(conn):
+    conn.exec_driver_sql(f"""
+        UPDATE tasks SET change_seq = numbered.change_seq
+        FROM (
+            SELECT task_id, (SELECT value FROM change_sequence WHERE name = '{TASK_SEQUENCE}')
+                + row_number() OVER (ORDER BY updated_at, task_id) AS change_seq
+            FROM tasks WHERE change_seq IS NULL
+        ) AS numbered
+        WHERE tasks.task_id = numbered.task_id""")
+    conn.exec_driver_sql(f"""
+        UPDATE change_sequence SET value = max(value, coalesce((SELECT max(change_seq) FROM tasks), 0))
+        WHERE name = '{TASK_SEQUENCE}'""")
+
+def cursor_expired(synced_at, now=None):
+    return synced_at < (now or datetime.now()) - SYNC_RETENTION
+
+def prune_tombstones(conn, now=None):
+    cutoff = (now or datetime.now()) - SYNC_RETENTION
+    return conn.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff)).rowcount
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["prune"]:
+        print("usage: python sync.py prune")
+        return 2
+    from database import init_db, sync_engine
+
+    init_db()
+    with sync_engine.begin() as conn:
+        pruned = prune_tombstones(conn)
+    print(f"Pruned {pruned} tombstones older than {SYNC_RETENTION.days} days")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
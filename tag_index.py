@@ -0,0 +1,94 @@
+# In-memory tag suggestions for GET /tags/suggest.
+#
+# A scope is ("user", user_id) for personal tasks or ("team", team_id) for a team's
+# tasks. Its tags are the ones it owns plus the ones used on its tasks, ranked by how
+# many of its tasks use them. A scope is loaded on first use with two indexed queries
+# and kept as a sorted list of case-folded names, so a prefix is a bisect plus a top-k.
+# Tags written in this process are added to loaded scopes right away; usage counts and
+# other workers' tags are picked up when the entry expires after TAG_INDEX_TTL seconds.
+import bisect
+import heapq
+import os
+import threading
+from sqlalchemy import and_, func, or_, select
+from models import Tag, Task, TaskTag
+from ttl_cache import TTLCache
+
+# Scope of the tags on a task
+def task_tag_scope(created_by, team_id):
+    return ("team", team_id) if team_id is not None else ("user", created_by)
+
+# Tags of a scope as (tag_id, name, usage) rows
+def load_scope_tags(db, scope):
+    kind, scope_id = scope
+    if kind == "team":
+        owned = Tag.team_id == scope_id
+        scope_tasks = Task.team_id == scope_id
+    else:
+        owned = and_(Tag.user_id == scope_id, Tag.team_id == None)
+        scope_tasks = and_(Task.created_by == scope_id, or_(Task.team_id == None, Task.team_id == ''))
+    used = db.execute(
+        select(Tag.tag_id, Tag.name, func.count()).join(TaskTag, TaskTag.tag_id == Tag.tag_id).join(
+            Task, Task.task_id == TaskTag.task_id
+        ).filter(scope_tasks).group_by(Tag.tag_id, Tag.name)
+    ).all()
+    seen = {tag_id for tag_id, _, _ in used}
+    unused = [(tag_id, name, 0) for tag_id, name in db.execute(select(Tag.tag_id, Tag.name).filter(owned)) if tag_id not in seen]
+    return used + unused
+
+# Tags of one scope sorted by case-folded name
+class ScopeTags:
+    def __init__(self, rows):
+        self.lock = threading.Lock()
+        rows = sorted(rows, key=lambda row: (row[1].casefold(), row[0]))
+        self.keys = [name.casefold() for _, name, _ in rows]
+        self.tags = [(tag_id, name, usage) for tag_id, name, usage in rows]
+        self.tag_ids = {tag_id for tag_id, _, _ in rows}
+
+    def add(self, tag_id, name):
+        key = name.casefold()
+        with self.lock:
+            if tag_id in self.tag_ids:
+                return
+            position = bisect.bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.tags.insert(position, (tag_id, name, 0))
+            self.tag_ids.add(tag_id)
+
+    # Up to limit tags whose name starts with prefix, most used first
+    def suggest(self, prefix, limit):
+        prefix = prefix.casefold()
+        with self.lock:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + "\U0010ffff", start) if prefix else len(self.keys)
+            matches = heapq.nsmallest(limit, range(start, end), key=lambda i: (-self.tags[i][2], self.keys[i]))
+            return [{"tag_id": self.tags[i][0], "name": self.tags[i][1], "usage_count": self.tags[i][2]} for i in matches]
+
+# scope -> ScopeTags for the scopes loaded recently
+class TagIndex:
+    def __init__(self, maxsize=1000, ttl=300):
+        self.entries = TTLCache(maxsize, ttl)
+
+    def get(self, scope):
+        return self.entries.get(scope)
+
+    def put(self, scope, rows):
+        return self.entries.put(scope, ScopeTags(rows))
+
+    # Add (tag_id, name) pairs to a scope if it is loaded; call after commit
+    def add(self, scope, tags):
+        entry = self.entries.peek(scope)
+        if entry is not None:
+            for tag_id, name in tags:
+                entry.add(tag_id, name)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return self.entries.stats()
+
+tag_index = TagIndex(
+    maxsize=int(os.getenv("TAG_INDEX_SIZE", "1000")),
+    ttl=float(os.getenv("TAG_INDEX_TTL", "300"))
+)
@@ -0,0 +1,129 @@
+# Team dashboard aggregates (GET /teams/{team_id}/stats and GET /teams/stats).
+#
+# Task counts by status, open tasks by due date and member counts are kept in
+# team_counters, which triggers on tasks update in the same transaction as the tasks
+# themselves, so a dashboard reads a handful of rows per team instead of its tasks.
+# Overdue depends on the day, so it is the sum of the "due" counters before today rather
+# than a counter of its own. Bulk loaders skip the counters and rebuild them at the end.
+#
+#   python team_stats.py rebuild
+import sys
+from datetime import date
+from sqlalchemy import String, cast, delete, func, insert, literal, or_, select, union_all
+from models import Task, TeamCounter, TeamMember
+
+STATUS = "status"
+DUE = "due"
+MEMBERS = "members"
+
+# Statuses that close a task; closed tasks are never overdue
+DONE_STATUSES = ("Done",)
+
+counters_table = TeamCounter.__table__
+
+DONE_LIST = ", ".join(f"'{status}'" for status in DONE_STATUSES)
+
+# Statements adding ("new") or removing ("old") a task row's counters: its status counter
+# and, while it is open, its due-date counter. Personal tasks have none. Counters that
+# drop to zero are removed.
+def counter_statements(row, delta):
+    statements = []
+    for kind, key, condition in (
+        (STATUS, f"{row}.status", "1"),
+        (DUE, f"{row}.due_date", f"{row}.due_date IS NOT NULL AND {row}.status NOT IN ({DONE_LIST})"),
+    ):
+        if delta > 0:
+            # The WHERE clause lets SQLite parse ON CONFLICT after INSERT ... SELECT
+            statements.append(f"""INSERT INTO team_counters (team_id, kind, key, value)
+            SELECT {row}.team_id, '{kind}', {key}, 1 WHERE {row}.team_id IS NOT NULL AND {condition}
+            ON CONFLICT (team_id, kind, key) DO UPDATE SET value = value + 1;""")
+        else:
+            match = f"team_id = {row}.team_id AND kind = '{kind}' AND key = {key} AND {condition}"
+            statements.append(f"UPDATE team_counters SET value = value - 1 WHERE {match};")
+            statements.append(f"DELETE FROM team_counters WHERE {match} AND value <= 0;")
+    return "\n            ".join(statements)
+
+# Triggers keep the task counters in the transaction of every write to tasks, whether it
+# comes from an endpoint, the archiver or Core, from the row as it is when the write runs
+COUNTER_STATEMENTS = (
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_counters_insert AFTER INSERT ON tasks BEGIN
+            {counter_statements("new", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_counters_delete AFTER DELETE ON tasks BEGIN
+            {counter_statements("old", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tasks_counters_update AFTER UPDATE OF team_id, status, due_date ON tasks
+    WHEN old.team_id IS NOT new.team_id OR old.status IS NOT new.status OR old.due_date IS NOT new.due_date BEGIN
+            {counter_statements("old", -1)}
+            {counter_statements("new", 1)}
+    END""",
+)
+
+COUNTER_TRIGGERS = ("tasks_counters_insert", "tasks_counters_delete", "tasks_counters_update")
+
+def init_counter_triggers(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in COUNTER_STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+# Bulk loaders drop the triggers and rebuild the counters once at the end
+def drop_counter_triggers(conn):
+    for trigger in COUNTER_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+
+# Stats for the given teams as {team_id: stats}; teams without counters get zeros
+def read_team_stats(db, team_ids, today=None):
+    today = (today or date.today()).isoformat()
+    stats = {
+        team_id: {"team_id": team_id, "task_count": 0, "tasks_by_status": {}, "overdue_count": 0, "member_count": 0}
+        for team_id in team_ids
+    }
+    if not stats:
+        return stats
+    rows = db.execute(
+        select(TeamCounter.team_id, TeamCounter.kind, TeamCounter.key, TeamCounter.value).filter(
+            TeamCounter.team_id.in_(stats),
+            or_(TeamCounter.kind != DUE, TeamCounter.key < today)
+        )
+    )
+    for team_id, kind, key, value in rows:
+        team_stats = stats[team_id]
+        if kind == STATUS:
+            team_stats["tasks_by_status"][key] = value
+            team_stats["task_count"] += value
+        elif kind == DUE:
+            team_stats["overdue_count"] += value
+        elif kind == MEMBERS:
+            team_stats["member_count"] = value
+    return stats
+
+# Recompute every counter from tasks and team_members: one grouped SELECT per kind of counter
+def rebuild_team_counters(conn):
+    status_counts = select(Task.team_id, literal(STATUS), Task.status, func.count()).filter(
+        Task.team_id != None
+    ).group_by(Task.team_id, Task.status)
+    due_counts = select(Task.team_id, literal(DUE), cast(Task.due_date, String), func.count()).filter(
+        Task.team_id != None, Task.due_date != None, Task.status.notin_(DONE_STATUSES)
+    ).group_by(Task.team_id, Task.due_date)
+    member_counts = select(TeamMember.team_id, literal(MEMBERS), literal(""), func.count()).group_by(TeamMember.team_id)
+    conn.execute(delete(counters_table))
+    return conn.execute(insert(counters_table).from_select(
+        ["team_id", "kind", "key", "value"], union_all(status_counts, due_counts, member_counts)
+    )).rowcount
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["rebuild"]:
+        print("usage: python team_stats.py rebuild")
+        return 2
+    from database import init_db, sync_engine
+
+    init_db()
+    with sync_engine.begin() as conn:
+        rebuilt = rebuild_team_counters(conn)
+    print(f"Rebuilt {rebuilt} team counters")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
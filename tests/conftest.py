@@ -0,0 +1,145 @@
+# The suite runs against a real uvicorn server, once per database driver. The app reads
+# DATABASE_URL when it is imported, so each driver gets a fresh process and database file;
+# tests talk to it over HTTP, which also lets streaming responses stream.
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+import httpx
+import pytest
+from sqlalchemy import create_engine, insert
+from models import Base, Team, TeamMember, User, compute_uid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATABASE_URLS = {
+    "sync": "sqlite:///{path}",
+    "async": "sqlite+aiosqlite:///{path}",
+}
+
+# Teams handed out one per test, so listings and counters don't see other tests' tasks
+TEAM_COUNT = 200
+# Seeded users; both are members of every team
+MEMBERS = ("alice", "bob")
+
+SERVER_ENV = {
+    # Tasks in this status are archived by the app on its next pass, so archive tests
+    # don't need to wait or backdate rows; no other test uses it
+    "ARCHIVE_STATUSES": "Shelved",
+    "ARCHIVE_AFTER_DAYS": "0",
+    "ARCHIVE_INTERVAL_SECONDS": "0.2",
+    "EVENTS_HEARTBEAT_SECONDS": "1",
+}
+
+class Server:
+    def __init__(self, url, database_url, db_path, process):
+        self.url = url
+        self.database_url = database_url
+        self.db_path = db_path
+        self.process = process
+        self.teams = itertools.count(1)
+        self.users = {}
+
+    def next_team(self):
+        team_id = next(self.teams)
+        assert team_id <= TEAM_COUNT, "raise TEAM_COUNT"
+        return team_id
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+# Users, teams and memberships have no write endpoints; they go in before the app starts,
+# which then builds the member counters from them
+def seed(db_path):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine, tables=[User.__table__, Team.__table__, TeamMember.__table__])
+    now = datetime.now()
+    users = {}
+    with engine.begin() as conn:
+        for user_id, name in enumerate(MEMBERS, start=1):
+            user = User(email=f"{name}@example.com", username=name)
+            conn.execute(insert(User), [{"user_id": user_id, "username": name, "email": user.email, "uid": user.uid, "created_at": now}])
+            users[name] = {"user_id": user_id, "uid": user.uid}
+        conn.execute(insert(Team), [{"team_id": team_id, "team_name": f"team{team_id}", "created_at": now} for team_id in range(1, TEAM_COUNT + 1)])
+        conn.execute(insert(TeamMember), [
+            {"team_id": team_id, "user_id": user["user_id"]} for team_id in range(1, TEAM_COUNT + 1) for user in users.values()
+        ])
+    engine.dispose()
+    return users
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with {process.returncode}")
+        try:
+            httpx.get(f"{url}/metrics", timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+@pytest.fixture(scope="session", params=sorted(DATABASE_URLS))
+def server(request, tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp(request.param) / "test.db")
+    users = seed(db_path)
+    database_url = DATABASE_URLS[request.param].format(path=db_path)
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, **SERVER_ENV, "DATABASE_URL": database_url},
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(url, process)
+        server = Server(url, database_url, db_path, process)
+        server.users = users
+        yield server
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+@pytest.fixture
+def client(server):
+    with httpx.Client(base_url=server.url, timeout=10) as client:
+        yield client
+
+@pytest.fixture
+def team_id(server):
+    return server.next_team()
+
+@pytest.fixture
+def members(server):
+    return server.users
+
+# A new user, for tests that need personal tasks of their own. uids are base64, so some
+# contain "/" and can't go in a path; those names are skipped.
+@pytest.fixture
+def user(client):
+    name = f"user{uuid.uuid4().hex[:12]}"
+    while "/" in compute_uid(f"{name}@example.com", name):
+        name = f"user{uuid.uuid4().hex[:12]}"
+    response = client.post("/user", json={"username": name, "email": f"{name}@example.com"})
+    assert response.status_code == 200
+    return response.json()
+
+def create_task(client, uid, title="task", status="Todo", **fields):
+    response = client.post("/tasks", json={"uid": uid, "title": title, "status": status, **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+# Wait until predicate() returns something truthy, for work the app does in the background
+def eventually(predicate, timeout=10, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while True:
+        result = predicate()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(interval)
@@ -0,0 +1,78 @@
+# The test server archives "Shelved" tasks on its next pass (see SERVER_ENV in conftest.py)
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+import archive
+from conftest import create_task, eventually
+from models import ArchivedTask, ArchivedTaskAssignee, ArchivedTaskTag, Base, Tag, Task, TaskAssignee, TaskTag, Team, User
+
+def archived_ids(client, path, **params):
+    live = {task["task_id"] for task in client.get(path, params=params).json()}
+    everything = {task["task_id"] for task in client.get(path, params={**params, "include_archived": True}).json()}
+    return everything - live
+
+def test_archived_tasks_leave_listings_counters_and_search(client, user, team_id, members):
+    uid = members["alice"]["uid"]
+    shelved = create_task(client, uid, title="shelved report", team_id=team_id, tags=["old"])
+    kept = create_task(client, uid, title="open report", team_id=team_id, due_date=date.today().isoformat())
+    personal = create_task(client, user["uid"], title="personal")
+    client.post("/tasks/assignees", json={"task_id": shelved["task_id"], "assignees": [members["bob"]["user_id"]]})
+    etag = client.get(f"/team-tasks/{team_id}", params={"include_archived": True}).headers["ETag"]
+    for task in (shelved, personal):
+        client.put(f"/tasks/{task['task_id']}", json={"status": "Shelved"})
+
+    assert eventually(lambda: archived_ids(client, f"/team-tasks/{team_id}") == {shelved["task_id"]})
+    assert eventually(lambda: archived_ids(client, f"/tasks/{user['uid']}") == {personal["task_id"]})
+    # The newest task was archived; its id is not handed out again
+    assert create_task(client, user["uid"])["task_id"] > personal["task_id"]
+
+    assert [task["task_id"] for task in client.get(f"/team-tasks/{team_id}").json()] == [kept["task_id"]]
+    archived = client.get(f"/team-tasks/{team_id}", params={"include_archived": True})
+    assert archived.headers["ETag"] != etag
+    entry = next(task for task in archived.json() if task["task_id"] == shelved["task_id"])
+    assert [tag["name"] for tag in entry["tags"]] == ["old"]
+    assert [assignee["user_id"] for assignee in entry["assignees"]] == [members["bob"]["user_id"]]
+    streamed = client.get(f"/team-tasks/{team_id}", params={"stream": True, "include_archived": True})
+    assert len(streamed.text.splitlines()) == 2
+
+    stats = client.get(f"/teams/{team_id}/stats").json()
+    assert (stats["task_count"], stats["tasks_by_status"]) == (1, {"Todo": 1})
+    results = client.get("/tasks/search", params={"q": "report", "team_id": team_id}).json()
+    assert [result["task_id"] for result in results] == [kept["task_id"]]
+
+    # Archived tasks are read-only but can be deleted
+    assert client.put(f"/tasks/{shelved['task_id']}", json={"title": "edit"}).status_code == 404
+    assert client.delete(f"/tasks/{shelved['task_id']}").status_code == 204
+    assert archived_ids(client, f"/team-tasks/{team_id}") == set()
+    assert client.delete(f"/tasks/{shelved['task_id']}").status_code == 404
+
+# Where foreign keys are enforced, deleting a task cascades to its join rows; the archiver
+# must copy them before that happens
+def test_archiver_keeps_join_rows_with_foreign_keys_enforced(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fk.db'}")
+
+    @event.listens_for(engine, "connect")
+    def enforce_foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(engine)
+    old = datetime.now() - archive.ARCHIVE_AFTER - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"user_id": 1, "username": "alice", "email": "alice@example.com", "uid": "alice"}])
+        conn.execute(insert(Team), [{"team_id": 1, "team_name": "team"}])
+        conn.execute(insert(Tag), [{"tag_id": 1, "name": "tag", "user_id": 1, "team_id": 1}])
+        conn.execute(insert(Task), [
+            {"task_id": 1, "title": "archived", "status": archive.ARCHIVE_STATUSES[0], "created_by": 1, "team_id": 1, "updated_at": old},
+            {"task_id": 2, "title": "open", "status": "Todo", "created_by": 1, "team_id": 1, "updated_at": old},
+        ])
+        conn.execute(insert(TaskTag), [{"task_id": 1, "tag_id": 1}, {"task_id": 2, "tag_id": 1}])
+        conn.execute(insert(TaskAssignee), [{"task_id": 1, "user_id": 1}, {"task_id": 2, "user_id": 1}])
+
+    assert archive.archive_expired(sessionmaker(engine)) == 1
+    with engine.connect() as conn:
+        count = lambda model: conn.execute(select(func.count()).select_from(model)).scalar()
+        assert (count(ArchivedTask), count(ArchivedTaskTag), count(ArchivedTaskAssignee)) == (1, 1, 1)
+        assert isinstance(conn.execute(select(ArchivedTask.archived_at)).scalar(), datetime)
+        assert conn.execute(select(TaskTag.task_id)).scalars().all() == [2]
+        assert conn.execute(select(TaskAssignee.task_id)).scalars().all() == [2]
+    engine.dispose()
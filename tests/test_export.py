@@ -0,0 +1,42 @@
+import csv
+import io
+import json
+import pytest
+from conftest import create_task
+
+def test_export_formats(client, team_id, members):
+    alice, bob = members["alice"], members["bob"]
+    created = [create_task(client, alice["uid"], title=f"task {i}", team_id=team_id, tags=["x", "y"]) for i in range(3)]
+    client.post("/tasks/assignees", json={"task_id": created[0]["task_id"], "assignees": [bob["user_id"]]})
+    task_ids = [task["task_id"] for task in created]
+
+    response = client.get("/export/tasks", params={"team_id": team_id, "format": "jsonl"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == f'attachment; filename="tasks-team-{team_id}.jsonl"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["task_id"] for row in rows] == task_ids
+    assert rows[0]["tags"] == ["x", "y"]
+    assert rows[0]["assignees"] == [bob["user_id"]]
+
+    response = client.get("/export/tasks", params={"team_id": team_id, "format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["task_id"]) for row in rows] == task_ids
+    assert (rows[0]["tags"], rows[0]["assignees"]) == ("x;y", str(bob["user_id"]))
+
+def test_export_empty_csv_has_header(client, user):
+    response = client.get("/export/tasks", params={"uid": user["uid"], "format": "csv"})
+    assert response.text.splitlines()[0].startswith("task_id,title")
+    assert len(response.text.splitlines()) == 1
+
+def test_export_parquet(client, user):
+    pq = pytest.importorskip("pyarrow.parquet")
+    created = [create_task(client, user["uid"], title=f"task {i}") for i in range(3)]
+    response = client.get("/export/tasks", params={"uid": user["uid"], "format": "parquet"})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("task_id").to_pylist() == [task["task_id"] for task in created]
+
+def test_export_errors(client):
+    assert client.get("/export/tasks").status_code == 400
+    assert client.get("/export/tasks", params={"uid": "missing"}).status_code == 404
+    assert client.get("/export/tasks", params={"team_id": 999999}).status_code == 404
+    assert client.get("/export/tasks", params={"team_id": 1, "format": "xml"}).status_code == 422
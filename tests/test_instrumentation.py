@@ -0,0 +1,27 @@
+import re
+from conftest import create_task
+
+def timings(response):
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r"(\w+);dur=([\d.]+)", response.headers["Server-Timing"])
+    }
+
+def test_server_timing_reports_encoding_as_serialization(client, team_id, members):
+    for i in range(50):
+        create_task(client, members["alice"]["uid"], title=f"task {i}", team_id=team_id, description="x" * 200)
+    response = client.get(f"/team-tasks/{team_id}")
+    timing = timings(response)
+    assert set(timing) == {"db", "app", "ser", "total"}
+    assert timing["ser"] > 0
+    assert timing["db"] + timing["app"] + timing["ser"] <= timing["total"]
+
+    # A request that encodes nothing has no serialization time
+    assert timings(client.get(f"/team-tasks/{team_id}", headers={"If-None-Match": response.headers["ETag"]}))["ser"] == 0
+
+def test_metrics_expose_serialization_histogram(client, team_id):
+    client.get(f"/team-tasks/{team_id}", params={"stream": True})
+    metrics = client.get("/metrics").text
+    assert "# HELP task_app_request_serialization_seconds Time spent encoding response bodies per request" in metrics
+    count = re.search(r'task_app_request_serialization_seconds_count\{method="GET",route="/team-tasks/\{team_id\}"\} (\d+)', metrics)
+    assert count and int(count.group(1)) >= 1
@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import Session
+from models import Base, Task
+from reminders import DUE_SOON, OVERDUE, QueueSink, ReminderScheduler
+
+# 09:00 on the 10th: a task due on the 11th is due soon from midnight on the 10th and
+# overdue from midnight on the 12th
+NOW = datetime(2030, 1, 10, 9, 0)
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def scheduler():
+    return ReminderScheduler(QueueSink(), lead=timedelta(hours=24), window_days=2)
+
+def add_task(db, task_id, due_date, status="Todo", updated_at=NOW - timedelta(days=1)):
+    db.execute(insert(Task), [{
+        "task_id": task_id, "title": f"task {task_id}", "status": status, "due_date": due_date,
+        "created_by": 1, "team_id": None, "created_at": updated_at, "updated_at": updated_at,
+    }])
+    db.commit()
+
+def change_task(db, task_id, updated_at, **values):
+    db.execute(update(Task).where(Task.task_id == task_id).values(updated_at=updated_at, **values))
+    db.commit()
+
+def fired(scheduler):
+    return [(reminder["type"], reminder["task_id"], reminder["due_date"]) for batch in scheduler.sink.batches for reminder in batch]
+
+def test_reminders_fire_once_each_across_reloads(db, scheduler):
+    add_task(db, 1, date(2030, 1, 11))
+    scheduler.refresh(db, NOW)
+    assert scheduler.stats() == {"scheduled": 2, "fired": 0}
+    # Due soon since midnight: fires on the first pass
+    assert scheduler.fire_due(db, NOW) == 1
+
+    # A write inside the overlap reloads the task; what already fired isn't scheduled again
+    change_task(db, 1, NOW + timedelta(seconds=10), title="renamed")
+    scheduler.refresh(db, NOW + timedelta(seconds=30))
+    assert scheduler.stats()["scheduled"] == 1
+    assert scheduler.fire_due(db, NOW + timedelta(seconds=30)) == 0
+
+    overdue_at = datetime(2030, 1, 12, 0, 0, 1)
+    scheduler.refresh(db, overdue_at)
+    assert scheduler.fire_due(db, overdue_at) == 1
+    assert scheduler.fire_due(db, overdue_at + timedelta(hours=1)) == 0
+    assert fired(scheduler) == [(DUE_SOON, 1, date(2030, 1, 11)), (OVERDUE, 1, date(2030, 1, 11))]
+    assert scheduler.stats() == {"scheduled": 0, "fired": 2}
+
+def test_a_due_date_changed_after_loading_fires_for_the_new_date(db, scheduler):
+    add_task(db, 1, date(2030, 1, 12))
+    scheduler.refresh(db, NOW)
+    change_task(db, 1, NOW + timedelta(minutes=5), due_date=date(2030, 1, 13))
+
+    # The reminder loaded for the 12th is re-checked against the row and dropped
+    old_due_soon = datetime(2030, 1, 11, 0, 0, 1)
+    assert scheduler.fire_due(db, old_due_soon) == 0
+    # The refresh picks up the updated row, and the new date's reminders fire on time
+    scheduler.refresh(db, old_due_soon)
+    assert scheduler.fire_due(db, old_due_soon) == 0
+    new_due_soon = datetime(2030, 1, 12, 0, 0, 1)
+    assert scheduler.fire_due(db, new_due_soon) == 1
+    assert fired(scheduler) == [(DUE_SOON, 1, date(2030, 1, 13))]
+
+def test_a_task_closed_before_firing_sends_nothing(db, scheduler):
+    add_task(db, 1, date(2030, 1, 11))
+    add_task(db, 2, date(2030, 1, 11))
+    add_task(db, 3, date(2030, 1, 11), status="Done")
+    scheduler.refresh(db, NOW)
+    assert scheduler.stats()["scheduled"] == 4
+    change_task(db, 1, NOW + timedelta(seconds=1), status="Done")
+
+    assert scheduler.fire_due(db, NOW) == 1
+    assert fired(scheduler) == [(DUE_SOON, 2, date(2030, 1, 11))]
+
+def test_refresh_loads_only_the_window(db, scheduler):
+    add_task(db, 1, date(2030, 1, 9))
+    add_task(db, 2, date(2030, 1, 13))
+    add_task(db, 3, date(2030, 1, 14))
+    scheduler.refresh(db, NOW)
+    # The window runs to the lead time plus window_days: the 13th
+    assert {entry[2] for entry in scheduler.heap} == {2}
+
+    # The next day's refresh adds the day that entered the window
+    scheduler.refresh(db, NOW + timedelta(days=1))
+    assert {entry[2] for entry in scheduler.heap} == {2, 3}
@@ -0,0 +1,35 @@
+from response_cache import ResponseCache
+
+def test_entries_are_evicted_by_total_body_size():
+    cache = ResponseCache(maxsize=100, maxbytes=10)
+    cache.put(("team", 1), None, '"a"', b"1234")
+    cache.put(("team", 2), None, '"b"', b"1234")
+    cache.get(("team", 1), None)
+    cache.put(("team", 3), None, '"c"', b"1234")
+    assert cache.get(("team", 2), None) is None
+    assert cache.get(("team", 1), None).body == b"1234"
+    assert cache.size == 8
+
+    # Replacing an entry counts only its new body
+    cache.put(("team", 1), None, '"d"', b"12")
+    assert cache.size == 6
+
+def test_a_body_over_the_budget_is_not_cached():
+    cache = ResponseCache(maxsize=100, maxbytes=10)
+    cache.put(("team", 1), None, '"a"', b"1234")
+    entry = cache.put(("team", 2), None, '"b"', b"x" * 11)
+    assert entry.body == b"x" * 11
+    assert cache.get(("team", 2), None) is None
+    assert cache.get(("team", 1), None) is not None
+    assert cache.size == 4
+
+def test_invalidate_and_entry_count_keep_the_size_in_step():
+    cache = ResponseCache(maxsize=2, maxbytes=100)
+    cache.put(("team", 1), None, '"a"', b"12")
+    cache.put(("team", 1), "overdue", '"b"', b"123")
+    cache.put(("user", 1), None, '"c"', b"1")
+    assert cache.get(("team", 1), None) is None
+    assert cache.size == 4
+    cache.invalidate(("team", 1))
+    assert cache.size == 1
+    assert set(cache.entries) == {(("user", 1), None)}
@@ -0,0 +1,77 @@
+def sync(client, uid, since=None, **params):
+    response = client.get("/sync", params={"uid": uid, **({"since": since} if since else {}), **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_full_sync_then_deltas_with_tombstones(client, user, members):
+    from conftest import create_task
+
+    alice = members["alice"]
+    kept = create_task(client, user["uid"], title="kept")
+    deleted = create_task(client, user["uid"], title="deleted")
+    client.put(f"/tasks/{kept['task_id']}", json={"assignee": [alice["user_id"]]})
+
+    full = sync(client, user["uid"])
+    assert {task["task_id"] for task in full["tasks"]} == {kept["task_id"], deleted["task_id"]}
+    assert full["deleted"] == []
+    assert not full["has_more"]
+
+    # Nothing changed since the cursor
+    unchanged = sync(client, user["uid"], full["next_cursor"])
+    assert (unchanged["tasks"], unchanged["deleted"]) == ([], [])
+
+    client.put(f"/tasks/{kept['task_id']}", json={"title": "kept and renamed"})
+    client.delete(f"/tasks/{kept['task_id']}/assignees/{alice['user_id']}")
+    client.delete(f"/tasks/{deleted['task_id']}")
+    delta = sync(client, user["uid"], full["next_cursor"])
+    assert [(task["task_id"], task["title"], task["assignee_ids"]) for task in delta["tasks"]] == [(kept["task_id"], "kept and renamed", [])]
+    assert [(entry["kind"], entry["task_id"], entry["user_id"]) for entry in delta["deleted"]] == [
+        ("assignee", kept["task_id"], alice["user_id"]),
+        ("task", deleted["task_id"], None),
+    ]
+
+    caught_up = sync(client, user["uid"], delta["next_cursor"])
+    assert (caught_up["tasks"], caught_up["deleted"]) == ([], [])
+
+def test_sync_pages_through_changes(client, user):
+    from conftest import create_task
+
+    created = [create_task(client, user["uid"], title=f"task {i}")["task_id"] for i in range(5)]
+    seen, cursor = [], None
+    while True:
+        page = sync(client, user["uid"], cursor, limit=2)
+        seen += [task["task_id"] for task in page["tasks"]]
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            break
+    assert seen == created
+
+def test_sync_rejects_bad_cursors(client, user):
+    assert client.get("/sync", params={"uid": user["uid"], "since": "garbage"}).status_code == 400
+    assert client.get("/sync", params={"uid": "missing"}).status_code == 404
+
+# A write stamped before the last synced change but committed after the sync, as a
+# transaction that waited for the write lock would be, still reaches the next delta
+def test_sync_follows_commit_order_not_timestamps(server, client, user):
+    import sqlite3
+    from conftest import create_task
+
+    late = create_task(client, user["uid"], title="late")
+    latest = create_task(client, user["uid"], title="latest")
+    full = sync(client, user["uid"])
+    assert [task["task_id"] for task in full["tasks"]] == [late["task_id"], latest["task_id"]]
+
+    with sqlite3.connect(server.db_path) as conn:
+        conn.execute(
+            "UPDATE tasks SET title = 'late write', updated_at = (SELECT min(updated_at) FROM tasks) WHERE task_id = ?",
+            (late["task_id"],)
+        )
+    delta = sync(client, user["uid"], full["next_cursor"])
+    assert [(task["task_id"], task["title"]) for task in delta["tasks"]] == [(late["task_id"], "late write")]
+
+def test_sync_expires_cursors_from_before_change_seq(client, user):
+    from datetime import datetime
+    from pagination import encode_cursor
+
+    legacy = encode_cursor(datetime.now(), 0, 0, datetime.now())
+    assert client.get("/sync", params={"uid": user["uid"], "since": legacy}).status_code == 410
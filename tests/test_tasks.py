@@ -0,0 +1,166 @@
+from datetime import date, timedelta
+from conftest import create_task
+
+def test_create_user_and_authenticate(client, user):
+    response = client.post("/auth", json={"uid": user["uid"]})
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user["user_id"]
+    assert client.post("/auth", json={"uid": "missing"}).status_code == 404
+
+def test_personal_tasks_are_paged_in_creation_order(client, user):
+    created = [create_task(client, user["uid"], title=f"task {i}", tags=["home"])["task_id"] for i in range(5)]
+
+    first = client.get(f"/tasks/{user['uid']}", params={"limit": 3})
+    assert first.status_code == 200
+    assert [task["task_id"] for task in first.json()] == created[:3]
+    assert [tag["name"] for tag in first.json()[0]["tags"]] == ["home"]
+    second = client.get(f"/tasks/{user['uid']}", params={"limit": 3, "after": first.headers["X-Next-Cursor"]})
+    assert [task["task_id"] for task in second.json()] == created[3:]
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get(f"/tasks/{user['uid']}", params={"after": "garbage"}).status_code == 400
+
+def test_listing_etag_is_revalidated_and_changes_on_write(client, user):
+    create_task(client, user["uid"])
+    first = client.get(f"/tasks/{user['uid']}")
+    etag = first.headers["ETag"]
+
+    not_modified = client.get(f"/tasks/{user['uid']}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    create_task(client, user["uid"], title="another")
+    changed = client.get(f"/tasks/{user['uid']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == 2
+
+def test_bulk_create_reports_each_task_in_request_order(client, user):
+    payload = [
+        {"uid": user["uid"], "title": "first", "status": "Todo", "tags": ["a", "b"]},
+        {"uid": "missing", "title": "skipped", "status": "Todo"},
+        {"uid": user["uid"], "title": "second", "status": "Done", "due_date": date.today().isoformat()},
+    ]
+    response = client.post("/tasks/bulk", json=payload)
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["status"] for result in results] == ["created", "error", "created"]
+    assert results[1]["detail"] == "User not found"
+    first, second = results[0]["task"], results[2]["task"]
+    assert (first["title"], second["title"]) == ("first", "second")
+    assert [tag["name"] for tag in first["tags"]] == ["a", "b"]
+
+    listed = {task["task_id"]: task for task in client.get(f"/tasks/{user['uid']}").json()}
+    assert listed[first["task_id"]]["title"] == "first"
+    assert listed[second["task_id"]]["title"] == "second"
+    assert listed[second["task_id"]]["status"] == "Done"
+
+# app.BULK_MAX_TASKS; importing app here would open the default database
+BULK_MAX_TASKS = 1000
+
+def test_bulk_create_matches_ids_to_rows_and_caps_the_batch(client, user):
+    payload = [{"uid": user["uid"], "title": f"task {i}", "status": "Todo"} for i in range(BULK_MAX_TASKS)]
+    results = client.post("/tasks/bulk", json=payload).json()
+    created = {result["task"]["task_id"]: result["task"]["title"] for result in results}
+    assert list(created.values()) == [task["title"] for task in payload]
+
+    stored = {}
+    cursor = None
+    while True:
+        page = client.get(f"/tasks/{user['uid']}", params={"limit": 100, **({"after": cursor} if cursor else {})})
+        stored.update((task["task_id"], task["title"]) for task in page.json())
+        cursor = page.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert stored == created
+
+    response = client.post("/tasks/bulk", json=payload + payload[:1])
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"At most {BULK_MAX_TASKS} tasks per request"
+
+def test_repeated_tag_names_are_one_tag(client, user):
+    task = create_task(client, user["uid"], tags=["z", "z", "y"])
+    assert [tag["name"] for tag in task["tags"]] == ["z", "y"]
+    listed = client.get(f"/tasks/{user['uid']}").json()
+    assert [task["task_id"] for task in listed] == [task["task_id"]]
+    assert sorted(tag["name"] for tag in listed[0]["tags"]) == ["y", "z"]
+
+    response = client.put(f"/tasks/{task['task_id']}", json={"tags": ["x", "x"]})
+    assert response.status_code == 200
+    assert [tag["name"] for tag in response.json()["tags"]] == ["x"]
+
+def test_update_and_delete_task(client, user, members):
+    task = create_task(client, user["uid"], tags=["old"])
+    response = client.put(f"/tasks/{task['task_id']}", json={"title": "renamed", "tags": ["new"], "assignee": [members["alice"]["user_id"]]})
+    assert response.status_code == 200
+    assert response.json()["title"] == "renamed"
+    assert [tag["name"] for tag in response.json()["tags"]] == ["new"]
+
+    assert client.delete(f"/tasks/{task['task_id']}").status_code == 204
+    assert client.delete(f"/tasks/{task['task_id']}").status_code == 404
+    assert client.put(f"/tasks/{task['task_id']}", json={"title": "gone"}).status_code == 404
+    assert client.get(f"/tasks/{user['uid']}").json() == []
+
+def test_bulk_update_by_ids_and_by_filter(client, user):
+    tasks = [create_task(client, user["uid"], title=f"task {i}") for i in range(3)]
+    task_ids = [task["task_id"] for task in tasks]
+
+    response = client.patch("/tasks/bulk", json={"task_ids": task_ids[:2], "status": "In Progress", "tags": ["bulk"]})
+    assert response.status_code == 200
+    assert response.json() == {"updated": 2, "task_ids": task_ids[:2]}
+
+    response = client.patch("/tasks/bulk", json={"filter": {"uid": user["uid"], "status": "Todo"}, "status": "Done"})
+    assert response.json() == {"updated": 1, "task_ids": task_ids[2:]}
+    listed = {task["task_id"]: task for task in client.get(f"/tasks/{user['uid']}").json()}
+    assert [listed[task_id]["status"] for task_id in task_ids] == ["In Progress", "In Progress", "Done"]
+    assert [tag["name"] for tag in listed[task_ids[0]]["tags"]] == ["bulk"]
+
+    assert client.patch("/tasks/bulk", json={"task_ids": [task_ids[0], 10**9], "status": "Done"}).status_code == 404
+    assert client.patch("/tasks/bulk", json={"task_ids": task_ids}).status_code == 400
+
+def test_assignees(client, team_id, members):
+    alice, bob = members["alice"], members["bob"]
+    task = create_task(client, alice["uid"], team_id=team_id)
+    task_id = task["task_id"]
+
+    assert client.post("/tasks/assignees", json={"task_id": task_id, "assignees": [bob["user_id"]]}).status_code == 201
+    response = client.post("/tasks/assignees/bulk", json={"task_ids": [task_id], "assign": [alice["user_id"]], "unassign": [bob["user_id"]]})
+    assert response.json() == {"task_ids": [task_id], "assigned": 1, "unassigned": 1}
+    listed = client.get(f"/team-tasks/{team_id}").json()
+    assert [user["user_id"] for user in listed[0]["assignees"]] == [alice["user_id"]]
+
+    assert client.delete(f"/tasks/{task_id}/assignees/{alice['user_id']}").status_code == 200
+    assert client.delete(f"/tasks/{task_id}/assignees/{alice['user_id']}").status_code == 404
+
+def test_search_ranks_title_matches_first(client, user):
+    in_title = create_task(client, user["uid"], title="quarterly report", description="numbers")
+    in_description = create_task(client, user["uid"], title="notes", description="draft the quarterly report")
+    create_task(client, user["uid"], title="unrelated", description="nothing here")
+
+    response = client.get("/tasks/search", params={"q": "quarterly", "uid": user["uid"], "highlight": True})
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["task_id"] for result in results] == [in_title["task_id"], in_description["task_id"]]
+    assert results[0]["title_highlight"] == "<mark>quarterly</mark> report"
+
+    paged = client.get("/tasks/search", params={"q": "quart", "uid": user["uid"], "limit": 1, "offset": 1}).json()
+    assert [result["task_id"] for result in paged] == [in_description["task_id"]]
+    assert client.get("/tasks/search", params={"q": "x"}).status_code == 400
+
+def test_tag_suggestions(client, user):
+    create_task(client, user["uid"], tags=["backend"])
+    create_task(client, user["uid"], tags=["backend", "bugfix"])
+    response = client.get("/tags/suggest", params={"uid": user["uid"], "prefix": "B"})
+    assert [(tag["name"], tag["usage_count"]) for tag in response.json()] == [("backend", 2), ("bugfix", 1)]
+
+    created = client.post("/tags", json={"name": "billing", "user_id": user["user_id"]})
+    assert created.status_code == 201
+    names = [tag["name"] for tag in client.get("/tags/suggest", params={"uid": user["uid"], "prefix": "bi"}).json()]
+    assert names == ["billing"]
+
+def test_upcoming_tasks(client, user):
+    today = date.today()
+    soon = create_task(client, user["uid"], due_date=(today + timedelta(days=2)).isoformat())
+    create_task(client, user["uid"], due_date=(today + timedelta(days=30)).isoformat())
+    create_task(client, user["uid"], status="Done", due_date=today.isoformat())
+    response = client.get(f"/tasks/{user['uid']}/upcoming", params={"days": 7})
+    assert [task["task_id"] for task in response.json()] == [soon["task_id"]]
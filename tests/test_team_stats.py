@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from sqlalchemy import create_engine, delete, insert, select, update
+from sqlalchemy.orm import Session
+from models import Base, Task, TeamCounter
+from team_stats import init_counter_triggers, rebuild_team_counters
+
+def counters(conn):
+    return sorted(conn.execute(select(TeamCounter.team_id, TeamCounter.kind, TeamCounter.key, TeamCounter.value)).all())
+
+def rebuilt(conn):
+    live = counters(conn)
+    rebuild_team_counters(conn)
+    return live, counters(conn)
+
+def make_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        init_counter_triggers(conn)
+    return engine
+
+# The triggers keep the counters equal to a rebuild from tasks after every kind of write
+def test_triggers_match_a_rebuild(tmp_path):
+    engine = make_engine(tmp_path)
+    due = date.today() + timedelta(days=3)
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [
+            {"task_id": 1, "title": "a", "status": "Todo", "team_id": 1, "due_date": due},
+            {"task_id": 2, "title": "b", "status": "Todo", "team_id": 1, "due_date": due},
+            {"task_id": 3, "title": "c", "status": "Done", "team_id": 2, "due_date": due},
+            {"task_id": 4, "title": "personal", "status": "Todo", "team_id": None, "due_date": due},
+        ])
+        assert counters(conn) == [
+            (1, "due", due.isoformat(), 2), (1, "status", "Todo", 2), (2, "status", "Done", 1),
+        ]
+        conn.execute(update(Task).where(Task.task_id == 1).values(status="Done"))
+        conn.execute(update(Task).where(Task.task_id == 2).values(team_id=2, due_date=due + timedelta(days=1)))
+        conn.execute(update(Task).where(Task.task_id == 3).values(title="renamed", status="Done"))
+        conn.execute(delete(Task).where(Task.task_id == 3))
+        live, expected = rebuilt(conn)
+        assert live == expected == [
+            (1, "status", "Done", 1), (2, "due", (due + timedelta(days=1)).isoformat(), 1), (2, "status", "Todo", 1),
+        ]
+    engine.dispose()
+
+# A delete that read its task before another request changed and committed it still
+# removes the counters the task has when the delete runs
+def test_interleaved_writes_keep_counters_exact(tmp_path):
+    engine = make_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(insert(Task), [{"task_id": 1, "title": "a", "status": "Todo", "team_id": 1}])
+    with Session(engine) as deleting, Session(engine) as updating:
+        task = deleting.get(Task, 1)
+        updating.get(Task, 1).status = "Done"
+        updating.commit()
+        deleting.delete(task)
+        deleting.commit()
+    with engine.begin() as conn:
+        assert rebuilt(conn) == ([], [])
+    engine.dispose()
@@ -0,0 +1,105 @@
+import json
+from collections import Counter
+from contextlib import ExitStack
+from datetime import date, timedelta
+import httpx
+from conftest import create_task
+
+def test_team_listing_and_stream_return_the_same_tasks(client, team_id, members):
+    uid = members["alice"]["uid"]
+    created = [create_task(client, uid, title=f"task {i}", team_id=team_id, tags=["team"])["task_id"] for i in range(3)]
+    create_task(client, uid, title="personal")
+
+    listed = client.get(f"/team-tasks/{team_id}")
+    assert listed.status_code == 200
+    assert [task["task_id"] for task in listed.json()] == created
+    assert listed.json()[0]["team"]["team_id"] == team_id
+
+    streamed = client.get(f"/team-tasks/{team_id}", params={"stream": True})
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in streamed.text.splitlines()] == listed.json()
+    assert client.get("/team-tasks/999999", params={"stream": True}).status_code == 404
+    assert client.get("/team-tasks/999999").status_code == 404
+
+def test_team_listing_etag(client, team_id, members):
+    create_task(client, members["alice"]["uid"], team_id=team_id)
+    etag = client.get(f"/team-tasks/{team_id}").headers["ETag"]
+    assert client.get(f"/team-tasks/{team_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    task_id = client.get(f"/team-tasks/{team_id}").json()[0]["task_id"]
+    client.put(f"/tasks/{task_id}", json={"status": "Done"})
+    assert client.get(f"/team-tasks/{team_id}", headers={"If-None-Match": etag}).status_code == 200
+
+# The counters behind the stats endpoints must match what the listing shows after every kind of write
+def test_stats_counters_follow_task_writes(client, team_id, members):
+    alice, bob = members["alice"], members["bob"]
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    first = create_task(client, alice["uid"], team_id=team_id, due_date=yesterday)
+    second = create_task(client, alice["uid"], team_id=team_id, status="In Progress", due_date=yesterday)
+    client.post("/tasks/bulk", json=[
+        {"uid": bob["uid"], "title": "bulk", "status": "Todo", "team_id": team_id, "due_date": tomorrow},
+        {"uid": bob["uid"], "title": "bulk", "status": "Done", "team_id": team_id, "due_date": yesterday},
+    ])
+    client.put(f"/tasks/{first['task_id']}", json={"status": "Done"})
+    client.patch("/tasks/bulk", json={"filter": {"team_id": team_id, "status": "Todo"}, "status": "Blocked"})
+    client.delete(f"/tasks/{second['task_id']}")
+
+    tasks = client.get(f"/team-tasks/{team_id}").json()
+    stats = client.get(f"/teams/{team_id}/stats").json()
+    assert stats == {
+        "team_id": team_id,
+        "task_count": len(tasks),
+        "tasks_by_status": dict(Counter(task["status"] for task in tasks)),
+        "overdue_count": sum(1 for task in tasks if task["status"] != "Done" and task["due_date"] < date.today().isoformat()),
+        "member_count": len(members),
+    }
+    assert stats["tasks_by_status"] == {"Done": 2, "Blocked": 1}
+    assert client.get("/teams/stats", params={"team_id": [team_id, 999999]}).json() == [stats]
+    assert client.get("/teams/999999/stats").status_code == 404
+
+def test_wildcard_if_none_match_does_not_hide_a_missing_team(client, team_id):
+    for path in ("/team-tasks/999999", "/team-tasks/999999/overdue"):
+        assert client.get(path, headers={"If-None-Match": "*"}).status_code == 404
+    assert client.get(f"/team-tasks/{team_id}", headers={"If-None-Match": "*"}).status_code == 304
+
+def test_overdue_team_tasks(client, team_id, members):
+    uid = members["alice"]["uid"]
+    late = create_task(client, uid, team_id=team_id, due_date=(date.today() - timedelta(days=3)).isoformat())
+    create_task(client, uid, team_id=team_id, status="Done", due_date=(date.today() - timedelta(days=3)).isoformat())
+    create_task(client, uid, team_id=team_id, due_date=date.today().isoformat())
+    response = client.get(f"/team-tasks/{team_id}/overdue")
+    assert [task["task_id"] for task in response.json()] == [late["task_id"]]
+
+def test_teams_and_members(client, team_id, members):
+    alice = members["alice"]
+    teams = client.get(f"/teams/{alice['uid']}").json()
+    assert team_id in {team["team_id"] for team in teams}
+    listed = client.get(f"/teams/{team_id}/members").json()
+    assert sorted(member["username"] for member in listed) == sorted(members)
+
+def test_sse_events_announce_task_changes(server, client, team_id, members):
+    with httpx.Client(base_url=server.url, timeout=10) as events:
+        with events.stream("GET", f"/teams/{team_id}/events") as stream:
+            lines = stream.iter_lines()
+            assert next(lines) == ": connected"
+            task = create_task(client, members["alice"]["uid"], team_id=team_id)
+            data = next(line for line in lines if line.startswith("data: "))
+    event = json.loads(data[len("data: "):])
+    assert (event["type"], event["task_id"]) == ("task.created", task["task_id"])
+    assert event["updated_at"] == task["updated_at"]
+    assert client.get("/teams/999999/events").status_code == 404
+
+# Open streams must not hold pooled connections: more streams than the pool's 5 + 10
+# connections stay open while ordinary requests are still served
+def test_event_streams_do_not_hold_database_connections(server, client, team_id):
+    # The line iterators are kept: dropping one closes its response
+    lines = []
+    with httpx.Client(base_url=server.url, timeout=5) as events, ExitStack() as streams:
+        for _ in range(20):
+            stream = streams.enter_context(events.stream("GET", f"/teams/{team_id}/events"))
+            assert stream.status_code == 200
+            lines.append(stream.iter_lines())
+            assert next(lines[-1]) == ": connected"
+        response = httpx.get(f"{server.url}/teams/{team_id}/members", timeout=5)
+        assert response.status_code == 200
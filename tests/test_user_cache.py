@@ -0,0 +1,95 @@
+import os
+import time
+from datetime import datetime
+import pytest
+from user_cache import CachedUser, FileInvalidationBackend, UserCache
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+def make_user(user_id):
+    return CachedUser(user_id, f"user{user_id}", f"user{user_id}@example.com", f"uid{user_id}", datetime(2030, 1, 1))
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = UserCache(ttl=60)
+    cache.put(make_user(1))
+    clock.now += 59
+    assert cache.get("uid1") == make_user(1)
+    clock.now += 1
+    assert cache.get("uid1") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1, "evictions": 0}
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = UserCache(maxsize=2)
+    cache.put(make_user(1))
+    cache.put(make_user(2))
+    assert cache.get("uid1") is not None
+    cache.put(make_user(3))
+    assert [cache.get(f"uid{i}") is not None for i in (1, 2, 3)] == [True, False, True]
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+def test_invalidation_reaches_other_workers(tmp_path, clock):
+    path = str(tmp_path / "invalidations")
+    first = UserCache(backend=FileInvalidationBackend(path, poll_interval=0.1))
+    second = UserCache(backend=FileInvalidationBackend(path, poll_interval=0.1))
+    for cache in (first, second):
+        cache.put(make_user(1))
+        cache.put(make_user(2))
+
+    first.invalidate("uid1")
+    assert first.get("uid1") is None
+    # The other worker reads the log on its next poll, at most once per interval
+    clock.now += 0.1
+    assert second.get("uid1") is None
+    assert second.get("uid2") is not None
+
+    second.invalidate("uid2")
+    clock.now += 0.1
+    assert first.get("uid2") is None
+
+def test_polls_are_rate_limited(tmp_path, clock, monkeypatch):
+    path = str(tmp_path / "invalidations")
+    writer = FileInvalidationBackend(path)
+    cache = UserCache(backend=FileInvalidationBackend(path, poll_interval=0.1))
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda *args, **kwargs: stats.append(args) or real_stat(*args, **kwargs))
+
+    cache.put(make_user(1))
+    writer.publish("uid1")
+    for _ in range(100):
+        assert cache.get("uid1") is not None
+    assert stats == []
+    clock.now += 0.1
+    assert cache.get("uid1") is None
+    assert len(stats) == 1
+
+def test_log_is_rotated_past_max_bytes(tmp_path, clock):
+    path = str(tmp_path / "invalidations")
+    writer = FileInvalidationBackend(path, poll_interval=0, max_bytes=64)
+    cache = UserCache(backend=FileInvalidationBackend(path, poll_interval=0))
+    for i in range(20):
+        writer.publish(f"uid{i}")
+        assert os.path.getsize(path) <= 64
+
+    # A reader that missed lines before the rotation drops everything it holds
+    cache.put(make_user(1))
+    cache.put(make_user(2))
+    for i in range(20):
+        writer.publish(f"other{i}")
+    assert cache.get("uid1") is None
+    assert cache.get("uid2") is None
+    # and follows the new log from its start
+    cache.put(make_user(3))
+    writer.publish("uid3")
+    assert cache.get("uid3") is None
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from ttl_cache import TTLCache
+
+# Detached copy of a users row, safe to share across sessions and threads
+CachedUser = namedtuple("CachedUser", ["user_id", "username", "email", "uid", "created_at"])
+
+# Invalidations only reach caches living in this process. Listeners are called with the
+# uid to drop, or with None to drop everything
+class MemoryInvalidationBackend:
+    def __init__(self):
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def publish(self, uid):
+        for listener in self.listeners:
+            listener(uid)
+
+    def poll(self):
+        pass
+
+# Local stand-in for a shared broker: every worker appends invalidated uids to one
+# log file and replays lines written by other workers, checking the file at most once
+# per poll_interval seconds. Past max_bytes the writer replaces the log with an empty
+# file; readers notice the new inode and drop everything, since the lines written after
+# their last poll went with the old file
+class FileInvalidationBackend(MemoryInvalidationBackend):
+    def __init__(self, path, poll_interval=0.1, max_bytes=1 << 20):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        open(self.path, "a").close()
+        stat = os.stat(self.path)
+        self.inode = stat.st_ino
+        self.offset = stat.st_size
+        self.next_poll = time.monotonic() + poll_interval
+
+    def publish(self, uid):
+        with open(self.path, "a") as log:
+            log.write(uid + "\n")
+            size = log.tell()
+        if size > self.max_bytes:
+            self.rotate()
+        super().publish(uid)
+
+    def rotate(self):
+        fresh = f"{self.path}.{os.getpid()}.{threading.get_ident()}"
+        open(fresh, "w").close()
+        os.replace(fresh, self.path)
+
+    def poll(self):
+        now = time.monotonic()
+        if now < self.next_poll:
+            return
+        self.next_poll = now + self.poll_interval
+        stat = os.stat(self.path)
+        if stat.st_ino == self.inode and stat.st_size <= self.offset:
+            return
+        with self.lock:
+            with open(self.path) as log:
+                inode = os.fstat(log.fileno()).st_ino
+                rotated = inode != self.inode
+                if rotated:
+                    self.inode, self.offset = inode, 0
+                log.seek(self.offset)
+                lines = log.readlines()
+                # Leave a partially written line for the next poll
+                if lines and not lines[-1].endswith("\n"):
+                    lines.pop()
+                self.offset += sum(len(line) for line in lines)
+        if rotated:
+            super().publish(None)
+        for line in lines:
+            super().publish(line.rstrip("\n"))
+
+# uid -> CachedUser, dropped in every worker sharing the backend on invalidate
+class UserCache:
+    def __init__(self, maxsize=10000, ttl=300, backend=None):
+        self.entries = TTLCache(maxsize, ttl)
+        self.backend = backend or MemoryInvalidationBackend()
+        self.backend.subscribe(self.evict)
+
+    def get(self, uid):
+        self.backend.poll()
+        return self.entries.get(uid)
+
+    def put(self, user):
+        cached = CachedUser(user.user_id, user.username, user.email, user.uid, user.created_at)
+        return self.entries.put(cached.uid, cached)
+
+    # Drop a uid here and in every other worker sharing the backend
+    def invalidate(self, uid):
+        self.backend.publish(uid)
+
+    def evict(self, uid):
+        if uid is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(uid)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return self.entries.stats()
+
+def make_backend():
+    if os.getenv("USER_CACHE_BACKEND", "memory") == "file":
+        return FileInvalidationBackend(
+            os.getenv("USER_CACHE_FILE", "./.user_cache_invalidations"),
+            poll_interval=float(os.getenv("USER_CACHE_POLL_MS", "100")) / 1000,
+            max_bytes=int(os.getenv("USER_CACHE_FILE_BYTES", str(1 << 20)))
+        )
+    return MemoryInvalidationBackend()
+
+user_cache = UserCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+    backend=make_backend()
+)